@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+from contextlib import contextmanager
+
+from openpyxl import Workbook
+
+from mock_seibro.server import MockSeibro, make_fixtures
+from utilitylib.tracing import TRACER
+from pipeline import ScrapeRun, fetch_ticker
+from resolver import IsinResolver
+from seibro_http import QUERIES
+
+@contextmanager
+def count_round_trips():
+    # Counts WebDriver commands sent from this process (pool workers run in their own processes)
+    from selenium.webdriver.remote.remote_connection import RemoteConnection
+    original = RemoteConnection.execute
+    counter = {"calls": 0}
+    def execute(self, command, params):
+        counter["calls"] += 1
+        return original(self, command, params)
+    RemoteConnection.execute = execute
+    try: yield counter
+    finally: RemoteConnection.execute = original
+
+@contextmanager
+def no_round_trips():
+    yield {"calls": 0}
+
+def write_list(path: str, items: list) -> str:
+    # Workbook with the LIST sheet the pipeline reads its companies from
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "LIST"
+    ws.append(["bond", "company"])
+    for bond_name, corp_name in items: ws.append([bond_name, corp_name])
+    wb.create_sheet("DB")
+    wb.create_sheet("EX")
+    wb.save(path)
+    return path
+
+def fixture_items(fixtures: dict) -> list:
+    # LIST rows [bond_name, company] for every bond in the fixtures
+    name_field = QUERIES["isin_search"]["fields"]["name"]
+    return [[bond[name_field], corp_name] for corp_name, bonds in fixtures["isin_search"].items() for bond in bonds]
+
+def bench_single(backend: str, mock: MockSeibro, item: list, args) -> dict:
+    '''
+    One get_single_ticker call (fresh session, empty ISIN index) against the mock.
+    '''
+    bond_name, corp_name = item
+    workdir = tempfile.mkdtemp(prefix="kind-bench-")
+    resolver = IsinResolver(os.path.join(workdir, "results_isin.json"))
+    run = ScrapeRun({"backend": backend, "base_url": mock.url, "rate": args.rate, "headless": True,
+                     "block_resources": not args.load_all, "capture": not args.no_capture,
+                     "output_path": os.path.join(workdir, "results.xlsx")}, log=lambda message: None)
+    requests_before = mock.requests + mock.page_loads
+    scraper = run._make_scraper()
+    TRACER.reset()
+    counting = count_round_trips if backend == "browser" else no_round_trips
+    try:
+        with counting() as counter:
+            start = time.perf_counter()
+            rows = fetch_ticker(scraper, corp_name, bond_name, args.from_date, args.to_date, resolver=resolver)
+            elapsed = time.perf_counter() - start
+    finally:
+        scraper.cleanup()
+    return {
+        "seconds": round(elapsed, 3),
+        "rows": len(rows or []),
+        "round_trips": counter["calls"],
+        "http_requests": mock.requests + mock.page_loads - requests_before,
+    }
+
+def bench_full(backend: str, mock: MockSeibro, items: list, args) -> dict:
+    '''
+    Full pipeline (ScrapeRun.run) over 'items' into a temporary workbook.
+    '''
+    workdir = tempfile.mkdtemp(prefix="kind-bench-")
+    output_path = write_list(os.path.join(workdir, "results.xlsx"), items)
+    run = ScrapeRun({"backend": backend, "base_url": mock.url, "rate": args.rate, "headless": True,
+                     "workers": args.workers, "from_date": args.from_date, "to_date": args.to_date, "incremental": False, "resume": False, "excel_batch": args.excel_batch,
+                     "sink": args.sink, "excel_export": args.excel_export,
+                     "block_resources": not args.load_all, "capture": not args.no_capture, "prices": not args.no_prices,
+                     "sweep": args.sweep, "output_path": output_path}, log=print if args.verbose else (lambda message: None))
+    requests_before = mock.requests + mock.page_loads
+    mock.static_bytes = 0
+    counting = count_round_trips if backend == "browser" else no_round_trips
+    with counting() as counter:
+        summary = run.run()
+    steps, metrics = TRACER.summary(), TRACER.metric_summary()
+    companies = summary["companies"] or 1
+    return {
+        "status": summary["status"],
+        "companies": summary["companies"],
+        "rows": summary["rows"],
+        "prices": summary["prices"],
+        "seconds": summary["elapsed"],
+        "companies_per_min": round(summary["companies"] / summary["elapsed"] * 60, 1) if summary["elapsed"] else 0.0,
+        "round_trips_per_company": round(counter["calls"] / companies, 1),
+        "http_requests_per_company": round((mock.requests + mock.page_loads - requests_before) / companies, 1),
+        "excel_write_seconds": steps.get("save_excel", {}).get("total", 0.0),
+        "excel_writes": steps.get("save_excel", {}).get("count", 0),
+        "stream_write_seconds": steps.get("write_rows", {}).get("total", 0.0),
+        "excel_export_seconds": steps.get("excel_export", {}).get("total", 0.0),
+        "page_load_p50": steps.get("open", {}).get("p50", 0.0),
+        "page_bytes_per_company": round(metrics.get("page_bytes", {}).get("total", 0) / companies),
+        "static_bytes": mock.static_bytes,
+        "steps": steps,
+    }
+
+def print_report(results: dict):
+    for backend, result in results.items():
+        single, full = result["single"], result["full"]
+        print(f"[{backend}]")
+        print(f"  single company   {single['seconds']:.3f}s, {single['rows']} rows, "
+              f"{single['round_trips']} WebDriver round trips, {single['http_requests']} HTTP requests")
+        print(f"  full run         {full['status']}: {full['companies']} companies, {full['rows']} rows, "
+              f"{full['prices']} price rows in {full['seconds']:.2f}s")
+        print(f"  companies/min    {full['companies_per_min']}")
+        print(f"  round trips      {full['round_trips_per_company']} WebDriver, {full['http_requests_per_company']} HTTP per company")
+        print(f"  excel write      {full['excel_write_seconds']:.3f}s over {full['excel_writes']} saves")
+        if backend == "browser":
+            print(f"  page load        p50 {full['page_load_p50']:.3f}s, {full['page_bytes_per_company']} bytes per company, "
+                  f"{full['static_bytes']} asset bytes served by the mock")
+        if full["stream_write_seconds"] or full["excel_export_seconds"]:
+            print(f"  stream write     {full['stream_write_seconds']:.3f}s, excel export {full['excel_export_seconds']:.3f}s")
+        print(f"  {'step':<16}{'count':>7}{'total':>10}{'p50':>9}{'p95':>9}")
+        for step, s in sorted(full["steps"].items(), key=lambda kv: -kv[1]["total"]):
+            print(f"  {step:<16}{s['count']:>7}{s['total']:>10.2f}{s['p50']:>9.3f}{s['p95']:>9.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local mock SEIBRO site.")
+    parser.add_argument("--backend", choices=["http", "browser", "all"], default="all")
+    parser.add_argument("--companies", type=int, default=10)
+    parser.add_argument("--bonds", type=int, default=2, help="bonds per company")
+    parser.add_argument("--rows", type=int, default=40, help="exercise rows per bond")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds the mock adds to every response")
+    parser.add_argument("--page-size", type=int, default=15, help="grid rows rendered per page")
+    parser.add_argument("--no-grid-model", action="store_true", help="hide the grid data model to force DOM paging")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-capture", action="store_true", help="read the grid from the DOM instead of captured responses")
+    parser.add_argument("--sweep", action="store_true", help="full run in market-wide sweep mode")
+    parser.add_argument("--no-prices", action="store_true", help="skip the exercise-price history")
+    parser.add_argument("--load-all", action="store_true", help="disable the network filter (compare page load cost)")
+    parser.add_argument("--rate", type=float, default=50.0, help="requests per second budget (the live default is much lower)")
+    parser.add_argument("--excel-batch", type=int, default=200)
+    parser.add_argument("--sink", default="excel", help="output format(s), as in cli.py")
+    parser.add_argument("--excel-export", action="store_true", help="convert streamed output to the workbook at the end")
+    parser.add_argument("--from-date", default="20210101")
+    parser.add_argument("--to-date", default=time.strftime("%Y%m%d"))
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    fixtures = make_fixtures(args.companies, args.bonds, args.rows)
+    items = fixture_items(fixtures)
+    backends = ["http", "browser"] if args.backend == "all" else [args.backend]
+
+    results = {}
+    with MockSeibro(fixtures, delay=args.delay, page_size=args.page_size, grid_model=not args.no_grid_model) as mock:
+        print(f"Mock SEIBRO at {mock.url}: {args.companies} companies, {len(items)} bonds, {args.rows} rows each")
+        for backend in backends:
+            try:
+                results[backend] = {"single": bench_single(backend, mock, items[0], args),
+                                    "full": bench_full(backend, mock, items, args)}
+            except Exception as e:
+                print(f"[{backend}] skipped: {e}")
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import sys
+import time
+import json
+import signal
+import argparse
+
+# Exit codes, one per run outcome (argparse exits with 2 on bad arguments)
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_EMPTY = 3       # the company list is empty
+EXIT_UNRESOLVED = 4  # completed, but some bonds were not found on SEIBRO
+EXIT_BLOCKED = 5     # SEIBRO kept blocking requests
+EXIT_FAILED = 6      # completed, but some companies failed (the next run tries them again)
+EXIT_STOPPED = 130   # interrupted (Ctrl+C / SIGTERM); the next run resumes
+
+def _date(text: str) -> str:
+    # YYYYMMDD, also accepting YYYY-MM-DD and YYYY/MM/DD
+    value = text.replace("-", "").replace("/", "")
+    try: time.strptime(value, "%Y%m%d")
+    except ValueError: raise argparse.ArgumentTypeError(f"not a date (YYYYMMDD): {text}")
+    return value
+
+def _sink(text: str) -> str:
+    names = [name.strip() for name in text.split(",")]
+    unknown = [name for name in names if name not in ("excel", "csv", "ndjson", "parquet", "gcs")]
+    if unknown: raise argparse.ArgumentTypeError(f"unknown output format: {', '.join(unknown)}")
+    return ",".join(names)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape SEIBRO exercise history without the GUI.")
+    parser.add_argument("--list", dest="list_path", help="company list: workbook with a LIST sheet or CSV (bond name, company) "
+                                                         "(default: the output workbook)")
+    parser.add_argument("--output", help="result workbook; cache, journal and trace files are kept next to it (default: results.xlsx)")
+    parser.add_argument("--sink", type=_sink, default="excel", help="output format: excel, csv, ndjson, parquet, gcs or several (csv,excel); "
+                                                        "streamed files are written next to --output")
+    parser.add_argument("--gcs-bucket", help="bucket for --sink gcs (compressed NDJSON batches per date and company)")
+    parser.add_argument("--gcs-prefix", default="kind", help="object prefix for --sink gcs")
+    parser.add_argument("--gcs-local", help="write the --sink gcs objects into this directory instead of a bucket")
+    parser.add_argument("--excel-export", action="store_true", help="convert the streamed files into the workbook at the end")
+    parser.add_argument("--from", dest="from_date", type=_date, default="20210101", help="start date, YYYYMMDD")
+    parser.add_argument("--to", dest="to_date", type=_date, help="end date, YYYYMMDD (default: today)")
+    parser.add_argument("--backend", choices=["browser", "http"], default="browser")
+    parser.add_argument("--profile", choices=["safe", "default", "parallel"], default="default", help="concurrency/rate preset")
+    parser.add_argument("--workers", type=int, help="browser processes (overrides the profile)")
+    parser.add_argument("--rate", type=float, help="requests per second across all workers (overrides the profile)")
+    parser.add_argument("--full", action="store_true", help="query the whole range instead of only the window since the last run")
+    parser.add_argument("--sweep", action="store_true", help="query every bond's exercises per date chunk at once and split them by "
+                                                              "the list (short refresh windows, large lists); EX is not refreshed")
+    parser.add_argument("--sweep-days", type=int, default=31, help="date chunk of a --sweep query, in days")
+    parser.add_argument("--no-store", action="store_true", help="stream each company's rows to the outputs instead of keeping them "
+                                                                 "in results.sqlite and exporting at the end")
+    parser.add_argument("--no-resume", action="store_true", help="start over instead of resuming an interrupted run")
+    parser.add_argument("--no-prices", action="store_true", help="skip the exercise-price history (EX sheet)")
+    parser.add_argument("--no-capture", action="store_true", help="read the grid from the page instead of the captured responses")
+    parser.add_argument("--fixed-timers", action="store_true", help="use the fixed wait timeouts instead of the ones learned "
+                        "from earlier runs (results_timers.json)")
+    parser.add_argument("--load-all", action="store_true", help="do not block images, fonts and analytics in Chrome")
+    parser.add_argument("--show-browser", action="store_true", help="run Chrome with a window")
+    parser.add_argument("--base-url", help="SEIBRO host to use instead of https://seibro.or.kr (e.g. the local mock)")
+    parser.add_argument("--quiet", action="store_true", help="only print progress and the final summary")
+    return parser.parse_args(argv)
+
+def build_config(args) -> dict:
+    from pipeline import PROFILES # heavy modules load only after the arguments are valid
+    config = dict(PROFILES[args.profile])
+    config.update({
+        "from_date": args.from_date,
+        "to_date": args.to_date,
+        "backend": args.backend,
+        "headless": not args.show_browser,
+        "block_resources": not args.load_all,
+        "capture": not args.no_capture,
+        "adaptive_timers": not args.fixed_timers,
+        "prices": not args.no_prices,
+        "incremental": not args.full,
+        "store": not args.no_store,
+        "sweep": args.sweep,
+        "sweep_days": args.sweep_days,
+        "resume": not args.no_resume,
+        "output_path": args.output,
+        "sink": args.sink,
+        "excel_export": args.excel_export,
+        "gcs_bucket": args.gcs_bucket,
+        "gcs_prefix": args.gcs_prefix,
+        "gcs_local": args.gcs_local,
+        "base_url": args.base_url,
+    })
+    if args.workers is not None: config["workers"] = args.workers
+    if args.rate is not None: config["rate"] = args.rate
+    return config
+
+def read_items(path: str) -> list:
+    from export_results import read_list_titles, read_list_csv
+    return read_list_csv(path) if path.lower().endswith(".csv") else read_list_titles(path)
+
+def exit_code(summary: dict) -> int:
+    status = summary.get("status")
+    if status == "completed":
+        if summary.get("failed"): return EXIT_FAILED
+        return EXIT_UNRESOLVED if summary.get("unresolved") else EXIT_OK
+    return {"empty": EXIT_EMPTY, "blocked": EXIT_BLOCKED, "stopped": EXIT_STOPPED}.get(status, EXIT_ERROR)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from pipeline import ScrapeRun
+
+    def log(message):
+        if not args.quiet: print(f"{time.strftime('%H:%M:%S')} - {message}", flush=True)
+
+    def progress(current, total):
+        print(f"{time.strftime('%H:%M:%S')} [{current}/{total}]", flush=True)
+
+    run = ScrapeRun(build_config(args), log=log, progress=progress)
+
+    # First Ctrl+C/SIGTERM stops at the next safe point (journal kept for resume); a second Ctrl+C aborts
+    def stop(signum, frame):
+        print("Stopping... (press Ctrl+C again to abort)", file=sys.stderr, flush=True)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        run.stop()
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        items = read_items(args.list_path) if args.list_path else None
+    except Exception as e:
+        print(f"Error: cannot read company list {args.list_path}: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    summary = run.run(items)
+    print(json.dumps(summary, ensure_ascii=False), flush=True)
+    return exit_code(summary)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,14 @@
 import os
 import sys
-from numpy import column_stack
-import pandas as pd
-from openpyxl import load_workbook
+import csv
+import json
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import date
+from openpyxl import Workbook, load_workbook
+
+from records import DB_COLUMNS, EX_COLUMNS, COLUMN_TYPES, typed_row
+from utilitylib.tracing import TRACER
 
 def _default_output_path(filename: str = "results.xlsx") -> str:
     # Get the default output path
@@ -10,45 +16,361 @@ def _default_output_path(filename: str = "results.xlsx") -> str:
 	else: base_dir = os.path.dirname(os.path.abspath(__file__))
 	return os.path.join(base_dir, filename)
 
-def save_excel(rows, output_path: str = None, sheet_name: str = None) -> str:
-    # Save data to the specified sheet
-    if sheet_name == "DB":
-        columns = ["title", "date", "exc_amount", "exc_shares", "exc_price", "listing_date"]
-    elif sheet_name == "EX":
-        columns = ["title", "date", "prv_prc", "cur_prc"]
-
-    # Create a dataframe from the rows
-    df = pd.DataFrame(rows)
-    available = [c for c in columns if c in df.columns]
-    df = df[available]
-    
-    if not output_path: output_path = _default_output_path()
+SCHEMAS = {"DB": DB_COLUMNS, "EX": EX_COLUMNS}
+
+def _save_workbook(wb, output_path: str) -> None:
+    # Crash-safe save: write a temp file next to the target, then atomically replace it
     output_dir = os.path.dirname(output_path) or "."
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Load the workbook
-    wb = load_workbook(output_path)
-    ws = wb[sheet_name]
-
-    # Write header
-    header_present = False
-    if ws.max_row >= 1:
-        for col_idx, col_name in enumerate(available, start=1):
-            if ws.cell(row=1, column=col_idx).value:
-                header_present = True
-                break
-    if not header_present:
-        for col_idx, col_name in enumerate(available, start=1):
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", prefix=".results-", dir=output_dir)
+    os.close(fd)
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+def _new_workbook():
+    # Empty workbook with the sheets the scraper writes (used when the output file does not exist yet)
+    wb = Workbook()
+    wb.active.title = "LIST"
+    for sheet_name in SCHEMAS: wb.create_sheet(sheet_name)
+    return wb
+
+def _append_rows(ws, rows, columns) -> None:
+    # Write the header if the sheet is empty, then append all rows in bulk
+    if ws.max_row <= 1 and not any(ws.cell(row=1, column=i).value for i in range(1, len(columns) + 1)):
+        for col_idx, col_name in enumerate(columns, start=1):
             ws.cell(row=1, column=col_idx, value=col_name)
+    for row in rows:
+        ws.append([row.get(col_name) for col_name in columns])
+
+class ExcelSink:
+    '''
+    Collects result rows in memory and writes them to the workbook in batches.
+    batch_size=0 writes once on close(); otherwise a flush happens every batch_size rows.
+    '''
+    def __init__(self, output_path: str = None, batch_size: int = 0):
+        self.output_path = output_path or _default_output_path()
+        self.batch_size = batch_size
+        self.pending = {}     # sheet_name -> rows waiting for the next flush
+        self.to_clear = set() # sheets to empty on the next flush
+        self.written = 0
+
+    def clear(self, *sheet_names):
+        # Deferred clear: applied in the same load/save as the first flush
+        for sheet_name in sheet_names:
+            self.to_clear.add(sheet_name)
+            self.pending.pop(sheet_name, None)
+
+    def add(self, rows, sheet_name: str = "DB"):
+        self.pending.setdefault(sheet_name, []).extend(rows)
+        if self.batch_size and sum(len(r) for r in self.pending.values()) >= self.batch_size:
+            self.flush()
+
+    def replace(self, sheet_name: str, rows):
+        # Replace the sheet with typed rows (records.typed_row), putting the dates back in 'YYYY/MM/DD'
+        dates = [col for col in SCHEMAS[sheet_name] if COLUMN_TYPES.get(col) == "date"]
+        self.clear(sheet_name)
+        self.add([{**row, **{col: row[col].replace("-", "/") if row[col] else row[col] for col in dates}} for row in rows], sheet_name)
+
+    @TRACER.traced("save_excel")
+    def flush(self) -> str:
+        if not self.to_clear and not any(self.pending.values()): return os.path.abspath(self.output_path)
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+
+        wb = load_workbook(self.output_path) if os.path.exists(self.output_path) else _new_workbook()
+        for sheet_name in self.to_clear:
+            if sheet_name in wb.sheetnames: wb[sheet_name].delete_rows(1, wb[sheet_name].max_row)
+        for sheet_name, rows in self.pending.items():
+            if sheet_name not in wb.sheetnames: wb.create_sheet(sheet_name)
+            if rows: _append_rows(wb[sheet_name], rows, SCHEMAS[sheet_name])
+        _save_workbook(wb, self.output_path)
+
+        self.written += sum(len(r) for r in self.pending.values())
+        self.pending, self.to_clear = {}, set()
+        return os.path.abspath(self.output_path)
+
+    def close(self) -> str:
+        return self.flush()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
+
+def save_excel(rows, output_path: str = None, sheet_name: str = None) -> str:
+    # Save data to the specified sheet
+    sink = ExcelSink(output_path)
+    sink.add(rows, sheet_name)
+    return sink.close()
+
+class StreamSink(ABC):
+    '''
+    Base of the append-only streaming sinks: one file per sheet (<prefix>_DB.<ext>, <prefix>_EX.<ext>)
+    in 'output_dir'. Rows are typed with records.COLUMN_TYPES and written as each company's rows arrive.
+    Same interface as ExcelSink (clear / add / flush / close); to_excel() converts the files into the workbook.
+    Subclasses implement the file format: _open, _write and read.
+    '''
+    extension = ""
+
+    def __init__(self, output_dir: str = None, prefix: str = "results"):
+        self.output_dir = output_dir or os.path.dirname(_default_output_path())
+        self.prefix = prefix
+        self.files = {} # sheet_name -> open file/writer
+        self.written = 0
+
+    def path(self, sheet_name: str) -> str:
+        return os.path.join(self.output_dir, f"{self.prefix}_{sheet_name}.{self.extension}")
+
+    def clear(self, *sheet_names):
+        for sheet_name in sheet_names:
+            self._close(sheet_name)
+            if os.path.exists(self.path(sheet_name)): os.remove(self.path(sheet_name))
+
+    @TRACER.traced("write_rows")
+    def add(self, rows, sheet_name: str = "DB"):
+        if not rows: return
+        columns = SCHEMAS[sheet_name]
+        if sheet_name not in self.files:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self.files[sheet_name] = self._open(sheet_name, columns)
+        self._write(sheet_name, columns, [typed_row(row, columns) for row in rows])
+        self.written += len(rows)
+
+    def flush(self) -> str:
+        for sheet_name in list(self.files): self._flush(sheet_name)
+        return os.path.abspath(self.output_dir)
+
+    def close(self) -> str:
+        for sheet_name in list(self.files): self._close(sheet_name)
+        return os.path.abspath(self.output_dir)
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
+
+    def to_excel(self, output_path: str = None) -> str:
+        '''
+        Final conversion: replace the workbook's sheets with the streamed rows (dates back in 'YYYY/MM/DD').
+        '''
+        self.close()
+        excel = ExcelSink(output_path)
+        for sheet_name in SCHEMAS:
+            if os.path.exists(self.path(sheet_name)): excel.replace(sheet_name, self.read(sheet_name))
+        return excel.close()
+
+    @abstractmethod
+    def _open(self, sheet_name, columns):
+        # Open the sheet's file for appending and return the handle kept in self.files
+        ...
+
+    @abstractmethod
+    def _write(self, sheet_name, columns, rows):
+        # Append typed rows to the sheet's open file
+        ...
+
+    @abstractmethod
+    def read(self, sheet_name) -> list:
+        # All typed rows of the sheet's file, dates as 'YYYY-MM-DD'
+        ...
+
+    def _flush(self, sheet_name):
+        self.files[sheet_name].flush()
+
+    def _close(self, sheet_name):
+        handle = self.files.pop(sheet_name, None)
+        if handle: handle.close()
+
+class CsvSink(StreamSink):
+    '''
+    Append-only CSV per sheet; the header is written once, when the file is new.
+    '''
+    extension = "csv"
 
-    # Write data
-    start_row = ws.max_row + 1
-    for offset, (_, row) in enumerate(df.iterrows(), start=0):
-        for col_idx, col_name in enumerate(available, start=1):
-            ws.cell(row=start_row + offset, column=col_idx, value=row.get(col_name))
+    def _open(self, sheet_name, columns):
+        handle = open(self.path(sheet_name), "a", encoding="utf-8", newline="")
+        if handle.tell() == 0: csv.writer(handle).writerow(columns)
+        return handle
 
-    wb.save(output_path)
-    return os.path.abspath(output_path)
+    def _write(self, sheet_name, columns, rows):
+        handle = self.files[sheet_name]
+        csv.writer(handle).writerows([["" if row[col] is None else row[col] for col in columns] for row in rows])
+        handle.flush() # one company at a time is on disk
+
+    def read(self, sheet_name) -> list:
+        with open(self.path(sheet_name), "r", encoding="utf-8", newline="") as f:
+            return [typed_row({k: (v if v != "" else None) for k, v in row.items()}, SCHEMAS[sheet_name])
+                    for row in csv.DictReader(f)]
+
+class NdjsonSink(StreamSink):
+    '''
+    Append-only newline-delimited JSON per sheet, one typed row object per line.
+    '''
+    extension = "ndjson"
+
+    def _open(self, sheet_name, columns):
+        return open(self.path(sheet_name), "a", encoding="utf-8")
+
+    def _write(self, sheet_name, columns, rows):
+        handle = self.files[sheet_name]
+        handle.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+        handle.flush()
+
+    def read(self, sheet_name) -> list:
+        with open(self.path(sheet_name), "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+class ParquetSink(StreamSink):
+    '''
+    Parquet file per sheet (requires pyarrow), written in row groups of 'row_group_size' rows.
+    A Parquet file is only readable once closed and cannot be appended to, so every run rewrites it.
+    '''
+    extension = "parquet"
+
+    def __init__(self, output_dir: str = None, prefix: str = "results", row_group_size: int = 10000):
+        try: import pyarrow, pyarrow.parquet
+        except ImportError: raise ImportError("Parquet output needs pyarrow (pip install pyarrow)")
+        super().__init__(output_dir, prefix)
+        self.row_group_size = row_group_size
+        self.buffers = {} # sheet_name -> rows waiting for the next row group
+
+    @staticmethod
+    def schema(columns):
+        import pyarrow as pa
+        types = {"str": pa.string(), "float": pa.float64(), "date": pa.date32()}
+        return pa.schema([(col, types[COLUMN_TYPES.get(col, "str")]) for col in columns])
+
+    def _open(self, sheet_name, columns):
+        import pyarrow.parquet as pq
+        self.buffers[sheet_name] = []
+        return pq.ParquetWriter(self.path(sheet_name), self.schema(columns))
+
+    def _write(self, sheet_name, columns, rows):
+        dates = [col for col in columns if COLUMN_TYPES.get(col) == "date"]
+        for row in rows:
+            for col in dates:
+                if row[col]: row[col] = date.fromisoformat(row[col])
+        self.buffers[sheet_name].extend(rows)
+        if len(self.buffers[sheet_name]) >= self.row_group_size: self._flush(sheet_name)
+
+    def _flush(self, sheet_name):
+        import pyarrow as pa
+        rows = self.buffers.get(sheet_name)
+        if not rows: return
+        writer = self.files[sheet_name]
+        writer.write_table(pa.Table.from_pylist(rows, schema=writer.schema))
+        self.buffers[sheet_name] = []
+
+    def _close(self, sheet_name):
+        if sheet_name in self.files: self._flush(sheet_name)
+        self.buffers.pop(sheet_name, None)
+        super()._close(sheet_name)
+
+    def read(self, sheet_name) -> list:
+        import pyarrow.parquet as pq
+        rows = pq.read_table(self.path(sheet_name)).to_pylist()
+        for row in rows:
+            for col, value in row.items():
+                if isinstance(value, date): row[col] = value.isoformat()
+        return rows
+
+class GcsSink:
+    '''
+    Uploads typed rows to a bucket as compressed NDJSON batches, partitioned by run date and company
+    (utilitylib.gcshandler.BatchWriter). 'local_root' writes into a directory instead of the bucket.
+    Objects are append-only: clear() has nothing to remove, and each run writes its own parts,
+    so the store exports only the rows changed in the run to it (ResultStore.export 'since').
+    '''
+    append_only = True
+
+    def __init__(self, bucket_name: str = None, prefix: str = "kind", local_root: str = None, spool_dir: str = None,
+                 batch_size: int = 1000, workers: int = 4):
+        from utilitylib.gcshandler import GCS, LocalBackend
+        if not bucket_name and not local_root: raise ValueError("GCS output needs a bucket name or a local directory")
+        self.gcs = GCS(bucket_name, backend=LocalBackend(local_root) if local_root else None)
+        self.writer = self.gcs.writer(prefix, batch_size=batch_size, workers=workers, spool_dir=spool_dir)
+        self.prefix = self.writer.prefix
+        self.written = 0
+
+    def clear(self, *sheet_names):
+        pass
+
+    @TRACER.traced("write_rows")
+    def add(self, rows, sheet_name: str = "DB"):
+        if not rows: return
+        columns = SCHEMAS[sheet_name]
+        self.writer.add([typed_row(row, columns) for row in rows], sheet_name)
+        self.written += len(rows)
+
+    def flush(self):
+        self.writer.flush()
+        return self.prefix
+
+    def close(self):
+        with TRACER.span("gcs_upload"): self.writer.close()
+        return self.prefix
+
+    def read(self, sheet_name) -> list:
+        # Rows uploaded by this run
+        return self.gcs.read_records(f"{self.prefix}/{sheet_name}/" if self.prefix else f"{sheet_name}/", self.writer.run_id)
+
+    def to_excel(self, output_path: str = None) -> str:
+        self.close()
+        excel = ExcelSink(output_path)
+        for sheet_name in SCHEMAS:
+            rows = self.read(sheet_name)
+            if rows: excel.replace(sheet_name, rows)
+        return excel.close()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
+
+class MultiSink:
+    '''
+    Fans every call out to several sinks, e.g. CSV for downstream jobs and Excel for people.
+    '''
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def clear(self, *sheet_names):
+        for sink in self.sinks: sink.clear(*sheet_names)
+
+    def add(self, rows, sheet_name: str = "DB"):
+        for sink in self.sinks: sink.add(rows, sheet_name)
+
+    def flush(self):
+        return [sink.flush() for sink in self.sinks]
+
+    def close(self):
+        return [sink.close() for sink in self.sinks]
+
+    def to_excel(self, output_path: str = None) -> str:
+        if any(isinstance(sink, ExcelSink) for sink in self.sinks): return self.close()
+        return self.sinks[0].to_excel(output_path)
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
+
+SINKS = {"excel": ExcelSink, "csv": CsvSink, "ndjson": NdjsonSink, "parquet": ParquetSink, "gcs": GcsSink}
+
+def make_sink(formats="excel", output_path: str = None, batch_size: int = 0, gcs: dict = None):
+    '''
+    Build the sink for 'formats' ("csv" or several, "csv,excel"). Streaming files go next to 'output_path'.
+    'gcs' holds the GcsSink arguments (bucket_name, prefix, local_root); its spool dir also goes next to 'output_path'.
+    '''
+    output_path = output_path or _default_output_path()
+    names = [name.strip() for name in formats.split(",")] if isinstance(formats, str) else list(formats)
+    sinks = []
+    for name in names:
+        if name not in SINKS: raise ValueError(f"Unknown output format: {name}")
+        if name == "excel": sinks.append(ExcelSink(output_path, batch_size=batch_size))
+        elif name == "gcs":
+            spool_dir = os.path.join(os.path.dirname(os.path.abspath(output_path)), "results_gcs_spool")
+            sinks.append(GcsSink(spool_dir=spool_dir, **(gcs or {})))
+        else: sinks.append(SINKS[name](os.path.dirname(os.path.abspath(output_path))))
+    return sinks[0] if len(sinks) == 1 else MultiSink(*sinks)
 
 def read_list_titles(output_path: str = None) -> list:
     # Read target companies from the LIST sheet
@@ -65,11 +387,17 @@ def read_list_titles(output_path: str = None) -> list:
 	wb.close()
 	return values
 
+def read_list_csv(path: str) -> list:
+    # Read target companies from a CSV laid out like the LIST sheet (bond name, company; first row is the header)
+	with open(path, "r", encoding="utf-8-sig", newline="") as f:
+		rows = list(csv.reader(f))
+	return [[str(row[0]).strip(), str(row[1]).strip()] for row in rows[1:] if len(row) >= 2 and any(row[:2])]
+
 def clear_excel(output_path: str = None, sheet_name: str = None) -> str:
     # Clear the specified sheet
 	if not output_path: output_path = _default_output_path()
 	wb = load_workbook(output_path)
 	ws = wb[sheet_name]
 	ws.delete_rows(1, ws.max_row)
-	wb.save(output_path)
+	_save_workbook(wb, output_path)
 	return os.path.abspath(output_path)
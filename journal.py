@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import hashlib
+
+from export_results import _default_output_path
+
+def list_signature(items) -> str:
+    # Identifies a company list so a journal is only resumed against the same LIST sheet
+    return hashlib.sha1(json.dumps(items, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class RunJournal:
+    '''
+    Append-only NDJSON journal of a scraping run. Every finished company is written and fsynced
+    with its rows, so an interrupted run can resume from the first unfinished company.
+    Companies that failed are journaled as such and are not completed: a resumed run queries them again.
+    '''
+    def __init__(self, path: str = None):
+        self.path = path or _default_output_path("results_journal.ndjson")
+        self.completed = {} # position -> {"company", "bond", "from_date", "to_date", "rows" (None if unresolved), "prices"}
+        self.failed = {}    # position -> {"company", "bond", "error"} of the latest failure
+        self.file = None
+
+    def _read(self):
+        header, completed, failed, finished = None, {}, {}, False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try: record = json.loads(line)
+                    except ValueError: continue # torn line from a crash
+                    if record.get("type") == "start": header = record
+                    elif record.get("type") == "company": completed[record["pos"]] = record
+                    elif record.get("type") == "failed": failed[record["pos"]] = record
+                    elif record.get("type") == "finish": finished = True
+        except FileNotFoundError: pass
+        for pos in completed: failed.pop(pos, None)
+        return header, completed, failed, finished
+
+    def start(self, items, resume: bool = True):
+        '''
+        Open the journal for 'items'. With 'resume', an unfinished journal of the same list is continued
+        and its finished companies are returned in self.completed; otherwise a new journal is started.
+        '''
+        signature = list_signature(items)
+        header, completed, failed, finished = self._read() if resume else (None, {}, {}, False)
+        if header and header.get("signature") == signature and not finished:
+            self.completed, self.failed = completed, failed
+            self.file = open(self.path, "a", encoding="utf-8")
+            if self.file.tell(): self.file.write("\n") # terminate a torn last line before appending
+        else:
+            self.completed, self.failed = {}, {}
+            self.file = open(self.path, "w", encoding="utf-8")
+            self._write({"type": "start", "signature": signature, "count": len(items), "started": time.strftime("%Y-%m-%d %H:%M:%S")})
+        return self
+
+    def _write(self, record: dict):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record(self, pos: int, item, rows, from_date: str, to_date: str, prices: list = None):
+        '''
+        Durably record a finished company, its rows and its exercise-price rows.
+        '''
+        record = {"type": "company", "pos": pos, "bond": item[0], "company": item[1],
+                  "from_date": from_date, "to_date": to_date, "rows": rows, "prices": prices} # None: unresolved
+        self._write(record)
+        self.completed[pos] = record
+
+    def fail(self, pos: int, item, error: str, from_date: str, to_date: str):
+        '''
+        Record that a company failed; it stays unfinished, so a resumed run tries it again.
+        '''
+        record = {"type": "failed", "pos": pos, "bond": item[0], "company": item[1],
+                  "from_date": from_date, "to_date": to_date, "error": error}
+        self._write(record)
+        self.failed[pos] = record
+
+    def finish(self):
+        '''
+        Mark the run complete; the next run starts a fresh journal.
+        '''
+        if self.file: self._write({"type": "finish", "finished": time.strftime("%Y-%m-%d %H:%M:%S")})
+        self.close()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,136 @@
+import json
+
+from seibro_http import QUERIES
+
+# Shared client code: posts a reqParam body to the service endpoint and parses the <result> rows
+SERVICE_SCRIPT = """
+function callService(query, params, done) {
+  var fields = '';
+  for (var key in params) fields += '<' + key + ' value="' + String(params[key]).replace(/&/g, '&amp;').replace(/"/g, '&quot;') + '"/>';
+  var body = '<reqParam action="' + query.action + '" task="' + query.task + '">' + fields + '</reqParam>';
+  var xhr = new XMLHttpRequest();
+  xhr.open('POST', '/websquare/engine/proworks/callServletService.jsp');
+  xhr.setRequestHeader('Content-Type', 'application/xml; charset=UTF-8');
+  xhr.onload = function() {
+    var doc = new DOMParser().parseFromString(xhr.responseText, 'text/xml');
+    var rows = [], results = doc.getElementsByTagName('result');
+    for (var i = 0; i < results.length; i++) {
+      var row = {}, children = results[i].children;
+      for (var j = 0; j < children.length; j++) row[children[j].tagName] = children[j].getAttribute('value');
+      rows.push(row);
+    }
+    done(rows);
+  };
+  xhr.send(body);
+}
+"""
+
+# Details page (BIP_CNTS03024V): bond selector opening the ISIN popup, date range, search button and a paged grid
+DETAILS_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>SEIBRO mock - 행사내역</title>
+<style>#iframeIsin { display: none; width: 600px; height: 400px; } td { padding: 0 4px; }
+@font-face { font-family: 'MockGothic'; src: url('/static/gothic.woff'); } body { font-family: 'MockGothic'; }</style>
+<script src="/websquare/engine/websquare.js"></script>
+<script>
+var QUERIES = __QUERIES__;
+var PAGE_SIZE = __PAGE_SIZE__;
+var GRID_MODEL = __GRID_MODEL__;
+__SERVICE_SCRIPT__
+var state = {rows: [], page: 0};
+function fmt(d) { return d ? d.slice(0, 4) + '/' + d.slice(4, 6) + '/' + d.slice(6, 8) : ''; }
+function openPopup() {
+  var frame = document.getElementById('iframeIsin');
+  frame.style.display = 'block';
+  frame.src = '/mock/isin_popup';
+}
+function selectBond(name, isin) {
+  document.getElementById('bd_input2_input').value = name;
+  document.getElementById('bd_input2_isin').value = isin;
+  var frame = document.getElementById('iframeIsin');
+  frame.style.display = 'none';
+  frame.src = 'about:blank';
+}
+function cells(row) {
+  var f = QUERIES.exercise_history.fields;
+  return [row.index, '', '', '', '', fmt(row[f.date]), row[f.exc_amount], '', row[f.exc_shares], row[f.exc_price], fmt(row[f.listing_date])];
+}
+function renderPage() {
+  var tbody = document.getElementById('grid1_body_tbody');
+  var html = '';
+  var page = state.rows.slice(state.page * PAGE_SIZE, (state.page + 1) * PAGE_SIZE);
+  for (var i = 0; i < page.length; i++) html += '<tr><td>' + cells(page[i]).join('</td><td>') + '</td></tr>';
+  tbody.innerHTML = html;
+  document.getElementById('totalCount').textContent = '총 ' + state.rows.length + ' 건';
+}
+function search() {
+  var params = {ISIN: document.getElementById('bd_input2_isin').value,
+                FROM_DT: document.getElementById('inputCalendar1_input').value,
+                TO_DT: document.getElementById('inputCalendar2_input').value,
+                START_PAGE: 1, END_PAGE: 100000};
+  callService(QUERIES.exercise_history, params, function(rows) {
+    for (var i = 0; i < rows.length; i++) rows[i].index = i + 1;
+    state.rows = rows; state.page = 0;
+    renderPage();
+  });
+}
+function nextPage() {
+  if ((state.page + 1) * PAGE_SIZE >= state.rows.length) return;
+  state.page++;
+  renderPage();
+}
+if (GRID_MODEL) {
+  // Minimal gridView API the scraper reads the whole result from
+  window.grid1 = {
+    getTotalRow: function() { return state.rows.length; },
+    getColumnCount: function() { return 11; },
+    getCellDisplayData: function(r, c) { return cells(state.rows[r])[c]; }
+  };
+}
+</script></head>
+<body>
+<img src="/static/logo.png"><img src="/static/banner.jpg">
+<input id="bd_input2_input" value=""><input id="bd_input2_isin" type="hidden" value="">
+<button id="bd_input2_image1" onclick="openPopup()">종목검색</button>
+<iframe id="iframeIsin"></iframe>
+<input id="inputCalendar1_input" value=""> ~ <input id="inputCalendar2_input" value="">
+<button id="image2" onclick="search()">조회</button>
+<div id="totalCount"></div>
+<table id="grid1"><tbody id="grid1_body_tbody"></tbody></table>
+<button id="gridPaging_next_btn" onclick="nextPage()">다음</button>
+</body></html>
+"""
+
+# Page assets: the WebSquare bundle (cacheable, always needed) and the images/fonts the filter may block
+STATIC_TYPES = {".js": "application/javascript", ".png": "image/png", ".jpg": "image/jpeg", ".woff": "font/woff"}
+STATIC_PATHS = ["/websquare/engine/websquare.js", "/static/logo.png", "/static/banner.jpg", "/static/gothic.woff"]
+
+# ISIN popup: company name search listing the company's bonds; clicking a row selects it on the parent page
+POPUP_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>SEIBRO mock - 종목검색</title>
+<script>
+var QUERIES = __QUERIES__;
+__SERVICE_SCRIPT__
+function search() {
+  callService(QUERIES.isin_search, {MENU_NO: '416', SECN_NM: document.getElementById('search_string').value}, function(rows) {
+    var f = QUERIES.isin_search.fields;
+    var html = '';
+    for (var i = 0; i < rows.length; i++) {
+      html += '<div id="isinList_' + i + '_group178">' + rows[i][f.name] + '</div>' +
+              '<div id="isinList_' + i + '_ISIN_ROW" onclick="parent.selectBond(\\'' + rows[i][f.name] + '\\', \\'' + rows[i][f.isin] + '\\')">' +
+              rows[i][f.isin] + '</div>';
+    }
+    document.getElementById('isinList').innerHTML = html;
+  });
+}
+</script></head>
+<body>
+<input id="search_string" value=""><button id="image2" onclick="search()">검색</button>
+<div id="isinList"></div>
+</body></html>
+"""
+
+def render_page(template: str, page_size: int = 15, grid_model: bool = True) -> str:
+    return (template.replace("__SERVICE_SCRIPT__", SERVICE_SCRIPT)
+                    .replace("__QUERIES__", json.dumps(QUERIES, ensure_ascii=False))
+                    .replace("__PAGE_SIZE__", str(page_size))
+                    .replace("__GRID_MODEL__", "true" if grid_model else "false"))
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from xml.sax.saxutils import quoteattr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utilitylib.websquare import SERVICE_PATH, parse_request
+from seibro_http import QUERIES
+from mock_seibro.pages import DETAILS_PAGE, POPUP_PAGE, STATIC_PATHS, STATIC_TYPES, render_page
+
+SYNTHETIC_NOTE = "Synthetic data in the format seibro_http.QUERIES assumes; not recorded from SEIBRO"
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures.json")
+
+def load_fixtures(path: str = FIXTURES_PATH) -> dict:
+    # Synthetic service responses: {"isin_search": {corp_name: rows}, "exercise_history": {isin: rows}, "price_history": ...}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def make_fixtures(companies: int = 20, bonds_per_company: int = 2, rows_per_bond: int = 30, seed: int = 0) -> dict:
+    # Synthetic responses, sized for benchmarks. They use the assumed QUERIES names and fields, not captured
+    # SEIBRO traffic, so runs against the mock only check the scraper against those assumptions
+    rng = random.Random(seed)
+    search_fields = QUERIES["isin_search"]["fields"]
+    exer_fields = QUERIES["exercise_history"]["fields"]
+    price_fields = QUERIES["price_history"]["fields"]
+    fixtures = {"_note": SYNTHETIC_NOTE, "isin_search": {}, "exercise_history": {}, "price_history": {}}
+    for c in range(companies):
+        corp_name = f"모의기업{c:03d}"
+        items = []
+        for b in range(bonds_per_company):
+            isin = f"KR6{c:04d}{b:02d}{rng.randint(0, 999):03d}"
+            items.append({search_fields["isin"]: isin, search_fields["name"]: f"{corp_name} {b + 1}회CB"})
+            rows = []
+            for r in range(rows_per_bond):
+                day = date(2021, 1, 4) + timedelta(days=r * 7 + b)
+                shares = rng.randint(1, 500) * 100
+                price = rng.randint(20, 900) * 100
+                rows.append({
+                    exer_fields["date"]: day.strftime("%Y%m%d"),
+                    exer_fields["exc_amount"]: f"{shares * price:,}",
+                    exer_fields["exc_shares"]: f"{shares:,}",
+                    exer_fields["exc_price"]: f"{price:,}",
+                    exer_fields["listing_date"]: (day + timedelta(days=14)).strftime("%Y%m%d"),
+                })
+            fixtures["exercise_history"][isin] = rows
+            refixes, price = [], rng.randint(20, 900) * 100
+            for r in range(rng.randint(0, 3)): # exercise-price refixings
+                new_price = int(price * rng.uniform(0.7, 0.95)) // 10 * 10
+                refixes.append({
+                    price_fields["date"]: (date(2021, 3, 1) + timedelta(days=r * 90 + b)).strftime("%Y%m%d"),
+                    price_fields["prv_prc"]: f"{price:,}",
+                    price_fields["cur_prc"]: f"{new_price:,}",
+                })
+                price = new_price
+            fixtures["price_history"][isin] = refixes
+        fixtures["isin_search"][corp_name] = items
+    return fixtures
+
+def render_rows(rows: list) -> str:
+    # WebSquare response body: <vector result="n"><data vectorkey="i"><result>...</result></data></vector>
+    body = []
+    for i, row in enumerate(rows):
+        fields = "".join(f"<{key} value={quoteattr(str(value))}/>" for key, value in row.items())
+        body.append(f'<data vectorkey="{i}"><result>{fields}</result></data>')
+    return f'<?xml version="1.0" encoding="UTF-8"?><vector result="{len(rows)}">{"".join(body)}</vector>'
+
+class MockSeibro:
+    '''
+    Local stand-in for SEIBRO, answering from synthetic fixtures: the service endpoint, plus the
+    details page and ISIN popup the browser flow drives (same element ids, data loaded over the service).
+    'page_size' rows are rendered per grid page; without 'grid_model' the scraper has to page through the DOM.
+    Page assets are 'static_size' bytes each; the WebSquare bundle is served as cacheable.
+    '''
+    def __init__(self, fixtures: dict = None, delay: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 page_size: int = 15, grid_model: bool = True, static_size: int = 200_000):
+        self.fixtures = fixtures if fixtures is not None else load_fixtures()
+        self.delay = delay
+        self.pages = {
+            "/websquare/control.jsp": render_page(DETAILS_PAGE, page_size, grid_model).encode("utf-8"),
+            "/mock/isin_popup": render_page(POPUP_PAGE).encode("utf-8"),
+        }
+        self.static = {path: (b"/*" + b" " * max(0, static_size - 4) + b"*/") if path.endswith(".js") else b"\0" * static_size
+                       for path in STATIC_PATHS}
+        self.requests = 0
+        self.page_loads = 0
+        self.static_bytes = 0 # asset bytes served, to compare runs with and without the network filter
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def exercise_rows(self, isin: str) -> list:
+        # One bond's rows, or without an ISIN every bond's rows tagged with its ISIN and name (the market-wide query)
+        if isin: return self.fixtures["exercise_history"].get(isin, [])
+        fields, search_fields = QUERIES["exercise_history"]["fields"], QUERIES["isin_search"]["fields"]
+        names = {bond[search_fields["isin"]]: bond[search_fields["name"]]
+                 for bonds in self.fixtures["isin_search"].values() for bond in bonds}
+        return [{**row, fields["isin"]: isin, fields["name"]: names.get(isin, "")}
+                for isin, rows in self.fixtures["exercise_history"].items() for row in rows]
+
+    def answer(self, action: str, params: dict) -> list:
+        if action == QUERIES["isin_search"]["action"]:
+            return self.fixtures["isin_search"].get(params.get("SECN_NM", ""), [])
+        if action == QUERIES["exercise_history"]["action"]:
+            date_field = QUERIES["exercise_history"]["fields"]["date"]
+            from_date, to_date = params.get("FROM_DT", ""), params.get("TO_DT", "99999999")
+            isin = params.get("ISIN", "")
+            rows = [row for row in self.exercise_rows(isin) if from_date <= row[date_field] <= to_date]
+            if not isin: rows.sort(key=lambda row: row[date_field])
+            start = int(params.get("START_PAGE", 1) or 1)
+            end = int(params.get("END_PAGE", len(rows)) or len(rows))
+            return rows[start - 1:end]
+        if action == QUERIES["price_history"]["action"]:
+            rows = self.fixtures.get("price_history", {}).get(params.get("ISIN", ""), [])
+            start = int(params.get("START_PAGE", 1) or 1)
+            end = int(params.get("END_PAGE", len(rows)) or len(rows))
+            return rows[start - 1:end]
+        return []
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path in mock.static:
+                    mock.static_bytes += len(mock.static[path])
+                    self._send(mock.static[path], STATIC_TYPES[os.path.splitext(path)[1]],
+                               cache=path.endswith(".js"))
+                    return
+                page = mock.pages.get(path)
+                if page is None:
+                    self.send_error(404); return
+                mock.page_loads += 1
+                if mock.delay: time.sleep(mock.delay)
+                self._send(page, "text/html; charset=UTF-8")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8")
+                mock.requests += 1
+                if self.path.split("?")[0] != SERVICE_PATH:
+                    self.send_error(404); return
+                if mock.delay: time.sleep(mock.delay)
+                action, _, params = parse_request(body)
+                self._send(render_rows(mock.answer(action, params)).encode("utf-8"), "text/xml; charset=UTF-8")
+
+            def _send(self, payload: bytes, content_type: str, cache: bool = False):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                if cache: self.send_header("Cache-Control", "max-age=3600")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args): pass # keep benchmark output clean
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self): return self.start()
+
+    def __exit__(self, *exc): self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic SEIBRO responses locally.")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--companies", type=int, default=0, help="serve synthetic fixtures for this many companies")
+    parser.add_argument("--rows", type=int, default=30, help="exercise rows per bond in synthetic fixtures")
+    args = parser.parse_args()
+    fixtures = make_fixtures(args.companies, rows_per_bond=args.rows) if args.companies else None
+    mock = MockSeibro(fixtures, delay=args.delay, port=args.port)
+    print(f"Mock SEIBRO listening on {mock.url}")
+    mock.server.serve_forever()
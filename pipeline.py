@@ -0,0 +1,456 @@
+import os
+import time
+import threading
+import multiprocessing
+
+from utilitylib.ratelimit import RateGovernor, SharedRateGovernor, BlockedError, ScrapeCancelled
+from utilitylib.tracing import TRACER
+from seibro_http import HttpScraper, exercise_record
+from records import isodate
+from resolver import IsinResolver
+from export_results import read_list_titles, ExcelSink, make_sink, _default_output_path
+from pool import BrowserPool
+from sweep import date_chunks, attribute
+from result_cache import ResultCache
+from result_store import ResultStore
+from journal import RunJournal
+from utilitylib.timing import AdaptiveTimers
+
+DEFAULT_CONFIG = {
+    "from_date": "20210101",
+    "to_date": None,          # None: today
+    "headless": True,
+    "backend": "browser",     # "browser" or "http"
+    "workers": 1,             # >1 runs that many browser processes under one shared rate budget
+    "incremental": True,      # only query the window since each bond's last scrape
+    "store": True,            # keep results in results.sqlite and export the sheets/files from it at the end
+    "resume": True,           # continue an interrupted run from its first unfinished company
+    "prices": True,           # also scrape the exercise-price history into the EX sheet
+    "sweep": False,           # one market-wide query per date chunk instead of one query per bond (DB sheet only)
+    "sweep_days": 31,         # date chunk of a sweep query
+    "capture": True,          # read grid rows from the captured service responses (DOM scraping as fallback)
+    "block_resources": True,  # skip images, fonts, media and analytics on SEIBRO pages (browser backend)
+    "rate": None,             # requests per second across all workers (None: the default adaptive budget)
+    "sink": "excel",          # "excel", "csv", "ndjson", "parquet", "gcs" or several ("csv,excel")
+    "gcs_bucket": None,       # bucket of the "gcs" sink
+    "gcs_prefix": "kind",     # object prefix of the "gcs" sink
+    "gcs_local": None,        # directory standing in for the bucket (offline runs)
+    "excel_export": False,    # convert the streamed files into the workbook once the run completes
+    "excel_batch": 200,       # rows buffered before the workbook is rewritten (0 = only at the end)
+    "output_path": None,      # results.xlsx; cache, journal, index and trace files are kept next to it
+    "base_url": None,         # serve SEIBRO pages/services from another host (e.g. the local mock)
+    "adaptive_timers": True,  # learn wait timeouts and buffers from observed latency (kept in results_timers.json)
+}
+
+# Concurrency/rate presets; explicit "workers"/"rate" settings override them
+PROFILES = {
+    "safe": {"workers": 1, "rate": 0.5},
+    "default": {},
+    "parallel": {"workers": 3},
+}
+
+def fetch_bond(scraper, corp_name, bond_name, from_date, to_date, resolver=None, prices=True):
+    # {"DB": exercise rows, "EX": exercise-price rows}; HttpScraper queries SEIBRO directly,
+    # TableScraper goes through the browser flow
+    with TRACER.company(f"{corp_name}|{bond_name}"):
+        if isinstance(scraper, HttpScraper): return scraper.get_bond(corp_name, bond_name, from_date, to_date, resolver=resolver, prices=prices)
+        from seibro_browser import get_bond # selenium is only loaded for the browser backend
+        try:
+            return get_bond(scraper, corp_name, bond_name, from_date, to_date, resolver=resolver, prices=prices)
+        except Exception:
+            if scraper.is_alive(): raise
+            print("Chrome session crashed, restarting...")
+            scraper.restart() # crash: relaunch once and retry this company
+            return get_bond(scraper, corp_name, bond_name, from_date, to_date, resolver=resolver, prices=prices)
+
+def fetch_company(scraper, corp_name, bonds, to_date, resolver=None, prices=True):
+    # One {"DB", "EX"} result per (bond_name, from_date) in 'bonds'; the company's bonds share one ISIN search
+    if len(bonds) == 1: return [fetch_bond(scraper, corp_name, bonds[0][0], bonds[0][1], to_date, resolver=resolver, prices=prices)]
+    with TRACER.company(corp_name):
+        if isinstance(scraper, HttpScraper): return scraper.get_company(corp_name, bonds, to_date, resolver=resolver, prices=prices)
+        from seibro_browser import get_company
+        try:
+            return get_company(scraper, corp_name, bonds, to_date, resolver=resolver, prices=prices)
+        except Exception:
+            if scraper.is_alive(): raise
+            print("Chrome session crashed, restarting...")
+            scraper.restart()
+            return get_company(scraper, corp_name, bonds, to_date, resolver=resolver, prices=prices)
+
+def failed_result(error) -> dict:
+    # Result of a bond whose company raised: journaled as failed, skipped, and retried by the next run
+    return {"DB": None, "EX": None, "error": str(error)}
+
+def group_by_company(items, indexes) -> dict:
+    # company -> its indexes among 'indexes', in list order
+    groups = {}
+    for i in indexes: groups.setdefault(items[i][1], []).append(i)
+    return groups
+
+def fetch_sweep(scraper, from_date, to_date):
+    # Raw exercise rows of every bond in the range, None if the sweep did not complete
+    if isinstance(scraper, HttpScraper): return scraper.sweep_exercise_rows(from_date, to_date)
+    from seibro_browser import sweep_exercise_rows
+    return sweep_exercise_rows(scraper, from_date, to_date)
+
+def fetch_ticker(scraper, corp_name, bond_name, from_date, to_date, resolver=None):
+    # Exercise rows only, None if the bond could not be resolved
+    return fetch_bond(scraper, corp_name, bond_name, from_date, to_date, resolver=resolver, prices=False)["DB"]
+
+class ScrapeRun:
+    '''
+    One scraping run over the LIST companies: scraper, ISIN index, cache, journal and output sink.
+    Progress is reported through the log/status/progress callbacks, so the GUI, the benchmark
+    and headless callers share the same pipeline.
+    '''
+    def __init__(self, config: dict = None, log=print, status=None, progress=None, cancel_event=None):
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        if not self.config["to_date"]: self.config["to_date"] = time.strftime("%Y%m%d")
+        self.log = log
+        self.status = status or (lambda text, color="blue": None)
+        self.progress = progress or (lambda current, total: None)
+        self.cancel_event = cancel_event or threading.Event()
+
+        self.output_path = self.config["output_path"] or _default_output_path()
+        self.scraper = None
+        self.sink = None
+        self.cache = None
+        self.journal = None
+        self.items = None     # the run's [bond_name, company] list
+        self.exported = False # store mode: outputs written from the store
+        self.run_stamp = None # store mode: start of the run, append-only sinks get the rows written after it
+        self.resolver = None
+        self.timers = None    # AdaptiveTimers shared by the scrapers of this run
+        self.summary = {}
+
+    def sidecar(self, filename: str) -> str:
+        # State files live next to the workbook
+        return os.path.join(os.path.dirname(os.path.abspath(self.output_path)), filename)
+
+    @property
+    def running(self) -> bool:
+        return not self.cancel_event.is_set()
+
+    def stop(self):
+        self.cancel_event.set() # interrupts the current company at its next driver call or wait
+
+    def _make_governor(self, shared: bool = False):
+        # A fixed 'rate' caps the adaptive governor at that many requests per second
+        rate = self.config["rate"]
+        if not rate: return None
+        limits = {"rate": rate, "max_rate": rate, "min_rate": min(rate, 0.2)}
+        if shared: return SharedRateGovernor(ctx=multiprocessing.get_context("spawn"), **limits)
+        return RateGovernor(**limits)
+
+    def _make_scraper(self):
+        config = self.config
+        if config["backend"] == "http":
+            kwargs = {"base_url": config["base_url"]} if config["base_url"] else {}
+            return HttpScraper(governor=self._make_governor(), adaptive=self.timers, cancel=self.cancel_event, **kwargs)
+        from utilitylib.driver import TableScraper
+        from seibro_browser import use_base_url, CAPTURE_PATTERN
+        if config["base_url"]: use_base_url(config["base_url"])
+        network_filter = None if config["block_resources"] else False
+        capture = CAPTURE_PATTERN if config["capture"] else None
+        if config["workers"] > 1 and not config["sweep"]: # a sweep is a handful of queries: one browser
+            scraper = BrowserPool(workers=config["workers"], headless=config["headless"], governor=self._make_governor(shared=True),
+                                  base_url=config["base_url"], resolver_path=self.sidecar("results_isin.json"),
+                                  network_filter=network_filter, capture=capture, timers=self.timers,
+                                  cancel_event=self.cancel_event)
+            scraper.start()
+            self.log(f"Chrome 브라우저 {config['workers']}개를 실행했습니다.")
+            return scraper
+        scraper = TableScraper(headless=config["headless"], governor=self._make_governor(), network_filter=network_filter,
+                               capture=capture, adaptive=self.timers)
+        scraper.cancel = self.cancel_event # Stop interrupts the current company
+        scraper.start()
+        self.log("Chrome 브라우저가 정상적으로 실행되었습니다.")
+        return scraper
+
+    def run(self, items: list = None) -> dict:
+        '''
+        Scrape 'items' ([bond_name, company] pairs, default: the LIST sheet) and write the DB and EX sheets.
+        Returns a summary dict whose "status" is completed, stopped, empty, blocked or error.
+        '''
+        config = self.config
+        started = time.perf_counter()
+        self.run_stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.summary = {"status": "error", "companies": 0, "rows": 0, "new_rows": 0, "prices": 0, "unresolved": 0,
+                        "failed": 0, "failures": [], "prices_missing": 0}
+        try:
+            self.log("세이브로 데이터 다운로드를 시작합니다.")
+            TRACER.reset()
+            self.status("준비 중...", "blue")
+
+            # Clear output sheets (Excel applies it together with the first write)
+            self.log("출력 파일을 준비하는 중...")
+            self.sink = make_sink(config["sink"], self.output_path, batch_size=config["excel_batch"],
+                                  gcs={"bucket_name": config["gcs_bucket"], "prefix": config["gcs_prefix"], "local_root": config["gcs_local"]})
+            self.sink.clear("DB", "EX")
+
+            # Read company list
+            self.log("회사 목록 읽는 중...")
+            excel = items if items is not None else read_list_titles(self.output_path)
+            if not excel:
+                self.log("엑셀 파일에 기업이 없습니다.")
+                self.status("기업이 없습니다.", "red")
+                self.summary["status"] = "empty"
+                return self.summary
+
+            self.log(f"{len(excel)}개 기업을 발견했습니다.")
+
+            self.journal = RunJournal(self.sidecar("results_journal.ndjson")).start(excel, resume=config["resume"])
+            if self.journal.completed:
+                self.log(f"이전 실행을 이어서 진행합니다. ({len(self.journal.completed)}개 완료됨)")
+            if self.journal.failed:
+                self.log(f"이전 실행에서 실패한 {len(self.journal.failed)}개 채권을 다시 시도합니다.")
+
+            if config["store"]:
+                self.cache = ResultStore(self.sidecar("results.sqlite")).load(legacy_cache=self.sidecar("results_cache.json"))
+            else:
+                self.cache = ResultCache(self.sidecar("results_cache.json")).load()
+            self.items = excel
+            self.resolver = IsinResolver(self.sidecar("results_isin.json")).load()
+            if config["incremental"]:
+                from_dates = [self.cache.since(item[1], item[0], config["from_date"]) for item in excel]
+            else:
+                from_dates = [config["from_date"]] * len(excel)
+
+            # Create scraper
+            if config["adaptive_timers"]: self.timers = AdaptiveTimers(self.sidecar("results_timers.json")).load()
+            self.scraper = self._make_scraper()
+
+            # Process details URL
+            self.status("행사내역 데이터를 수집하는 중...", "blue")
+            self.log("행사내역 데이터를 수집하는 중...\n")
+            total_companies = len(excel)
+
+            for i, item, result, window in self.iter_results(excel, from_dates):
+                if not self.running:
+                    break
+
+                self.progress(i + 1, total_companies)
+                company, keyword = item[1], item[0]
+                self.summary["companies"] += 1
+                rows = result["DB"]
+
+                if result.get("error"): # this company failed: the others go on, the next run retries it
+                    self.summary["failed"] += 1
+                    self.summary["failures"].append({"company": company, "bond": keyword, "error": result["error"]})
+                    self.log(f"{keyword} 수집 중 오류가 발생해 건너뜁니다: {result['error']}\n")
+                    continue
+
+                if rows is None:
+                    self.summary["unresolved"] += 1
+                    self.log(f"{keyword}을(를) 검색 결과에서 찾지 못했습니다. (미해결)\n")
+                    continue
+
+                # Merge the new window into the cached history; exercise-price history is always queried in full,
+                # so it replaces the cached copy (never with an empty result, which is more likely a failed query)
+                new_count = len(rows)
+                self.cache.merge(company, keyword, rows, *window)
+                if result.get("EX"): self.cache.set_prices(company, keyword, result["EX"])
+                elif config["prices"] and result.get("EX_queried", True): # the price query failed or was not confirmed
+                    self.summary["prices_missing"] += 1
+                    self.log(f"{keyword}의 행사가액 변동 내역을 확인하지 못해 기존 내역을 유지합니다.")
+                self.summary["new_rows"] += new_count
+                if config["store"]: # the outputs are exported from the store at the end
+                    self.log(f"{keyword}의 신규 {new_count}개 데이터를 저장했습니다.\n")
+                    continue
+
+                # Emit the full history
+                rows = self.cache.rows(company, keyword)
+                if rows:
+                    self.sink.add(rows, sheet_name="DB")
+                    self.summary["rows"] += len(rows)
+                    self.log(f"{keyword}의 {len(rows)}개 데이터를 수집했습니다. (신규 {new_count}개)\n")
+                else:
+                    self.log(f"{keyword}의 해당하는 데이터가 없습니다.\n")
+
+                prices = self.cache.prices(company, keyword)
+                if prices:
+                    self.sink.add(prices, sheet_name="EX")
+                    self.summary["prices"] += len(prices)
+
+            if not self.running:
+                raise ScrapeCancelled()
+
+            # Cleanup
+            self.scraper.cleanup()
+            self.log("Chrome 브라우저가 정상적으로 종료되었습니다.")
+
+            self.progress(total_companies, total_companies)
+            self.export()
+            self.sink.close()
+            if config["excel_export"] and not isinstance(self.sink, ExcelSink):
+                self.log("엑셀로 변환하는 중...")
+                with TRACER.span("excel_export"): self.sink.to_excel(self.output_path)
+            self.cache.save()
+            self.journal.finish()
+            stats = self.scraper.governor.stats
+            self.summary["requests"] = dict(stats)
+            self.log(f"요청 {stats['requests']}회, 속도 제한 대기 {stats['waited']:.1f}초, 차단 감지 {stats['blocks']}회")
+            if self.summary["prices_missing"]:
+                self.log(f"행사가액 변동 내역을 확인하지 못한 채권 {self.summary['prices_missing']}개 (기존 내역 유지)")
+            self.report_timings()
+            self.report_timers()
+            self.status("Completed!", "green")
+            self.log("모든 데이터가 저장되었습니다.")
+            self.log("데이터 수집이 완료되었습니다.")
+            self.summary["status"] = "completed"
+
+        except ScrapeCancelled:
+            self.status("Stopped", "orange")
+            self.log("수집을 중지했습니다. 다시 시작하면 이어서 진행합니다.")
+            self.summary["status"] = "stopped"
+        except BlockedError as e:
+            self.log(f"세이브로가 요청을 차단했습니다: {str(e)}")
+            self.status("접속이 차단되었습니다.", "red")
+            self.summary["status"], self.summary["error"] = "blocked", str(e)
+        except Exception as e:
+            self.log(f"Error: {str(e)}")
+            self.status("오류가 발생했습니다.", "red")
+            self.summary["status"], self.summary["error"] = "error", str(e)
+        finally:
+            self.close()
+            self.summary["elapsed"] = round(time.perf_counter() - started, 3)
+        return self.summary
+
+    def export(self):
+        # Store mode: replace the output sheets/files with the stored history of the listed bonds
+        if self.exported or not isinstance(self.cache, ResultStore) or self.items is None or self.sink is None: return
+        self.exported = True
+        self.log("저장된 결과를 출력 파일로 내보내는 중...")
+        with TRACER.span("export"): counts = self.cache.export(self.sink, self.items, since=self.run_stamp)
+        self.summary["rows"], self.summary["prices"] = counts["DB"], counts["EX"]
+        if "changed" in counts:
+            self.log(f"추가 전용 출력에는 이번 실행에서 바뀐 행만 올렸습니다. (DB {counts['changed']['DB']}행, EX {counts['changed']['EX']}행)")
+
+    def close(self):
+        # Persist whatever was collected, even after a stop or error
+        if self.journal:
+            self.journal.close()
+        try: self.export()
+        except Exception as e: self.log(f"내보내기 오류: {str(e)}")
+        for name, store in (("ISIN 목록", self.resolver), ("캐시", self.cache), ("출력 파일", self.sink), ("대기 시간", self.timers)):
+            if store:
+                try:
+                    store.close() if store is self.sink or isinstance(store, ResultStore) else store.save()
+                except Exception as e:
+                    self.log(f"{name} 저장 오류: {str(e)}")
+        if self.timers: self.summary["timers"] = self.timers.report()
+        if self.scraper:
+            try:
+                self.scraper.cleanup()
+            except:
+                pass
+
+    def report_timings(self):
+        # Log the per-step timing summary and export the full trace next to the workbook
+        self.log("단계별 소요 시간 (초):")
+        for line in TRACER.report_lines():
+            self.log(line)
+        TRACER.export_json(self.sidecar("results_trace.json"))
+        TRACER.export_csv(self.sidecar("results_trace.csv"))
+
+    def report_timers(self):
+        # Log the learned waits; summary["timers"] is filled in close() so stopped runs report them too
+        if not self.timers: return
+        report = self.timers.report()
+        self.log(f"대기 시간 (초): 버퍼 {report['buffer_time']}")
+        for action, values in sorted(report["actions"].items()):
+            chosen = values["timeout"] if values["timeout"] is not None else "기본값"
+            self.log(f"  {action}: 제한 {chosen}, p50 {values['p50']}, p95 {values['p95']} ({values['samples']}회, 시간 초과 {values['timeouts']}회)")
+
+    def iter_results(self, excel, from_dates):
+        '''
+        Yield (index, item, {"DB": rows, "EX": prices}, (from_date, to_date)) in list order.
+        Companies finished in the journal are replayed; the rest come from the pool or one at a time
+        and are journaled as soon as they finish.
+        '''
+        to_date = self.config["to_date"]
+        completed = self.journal.completed
+        pending = [i for i in range(len(excel)) if i not in completed]
+        if isinstance(self.scraper, BrowserPool):
+            fresh = self.scraper.map([excel[i] for i in pending], [from_dates[i] for i in pending], to_date, self.resolver,
+                                     prices=self.config["prices"])
+        elif self.config["sweep"] and pending:
+            fresh = self._sweep_each(excel, pending, from_dates, to_date)
+        else:
+            fresh = self._fetch_each(excel, pending, from_dates, to_date)
+
+        for i, item in enumerate(excel):
+            if i in completed:
+                record = completed[i]
+                result = {"DB": record["rows"], "EX": record.get("prices"), "EX_queried": False} # queried in an earlier run
+                yield i, item, result, (record["from_date"], record["to_date"])
+                continue
+            if not self.running:
+                return
+            _, _, result = next(fresh)
+            if result.get("error"): self.journal.fail(i, item, result["error"], from_dates[i], to_date)
+            else: self.journal.record(i, item, result["DB"], from_dates[i], to_date, prices=result["EX"])
+            yield i, item, result, (from_dates[i], to_date)
+
+    def _fetch_each(self, excel, pending, from_dates, to_date):
+        # A company's bonds are fetched together when its first pending bond comes up, then released in list order
+        groups, done = group_by_company(excel, pending), {}
+        for k, i in enumerate(pending):
+            item = excel[i]
+            if i not in done:
+                group = groups[item[1]]
+                self.log(f"{item[1]}의 행사내역 데이터를 수집하는 중... ({len(group)}개 채권, {i+1}/{len(excel)})")
+                try:
+                    results = fetch_company(self.scraper, item[1], [(excel[j][0], from_dates[j]) for j in group], to_date,
+                                            resolver=self.resolver, prices=self.config["prices"])
+                except BlockedError: raise
+                except Exception as e: # one company's failure must not end the run (nor block every resume)
+                    self.log(f"{item[1]} 수집 오류: {str(e)}")
+                    results = [failed_result(e)] * len(group)
+                done.update(zip(group, results))
+            yield k, item, done.pop(i)
+
+    def _sweep_each(self, excel, pending, from_dates, to_date):
+        # Market-wide queries over the pending window; per-bond queries only for entries they cannot attribute
+        found, fallback = self._sweep(excel, pending, min(from_dates[i] for i in pending), to_date)
+        for k, i in enumerate(pending):
+            item = excel[i]
+            if i in fallback:
+                self.log(f"{item[0]}의 행사내역 데이터를 개별 조회하는 중... ({i+1}/{len(excel)})")
+                try:
+                    result = fetch_bond(self.scraper, item[1], item[0], from_dates[i], to_date, resolver=self.resolver,
+                                        prices=self.config["prices"])
+                except BlockedError: raise
+                except Exception as e:
+                    self.log(f"{item[0]} 수집 오류: {str(e)}")
+                    result = failed_result(e)
+                yield k, item, result
+                continue
+            start = isodate(from_dates[i]) # the chunks start at the earliest window: keep this bond's window only
+            rows = [row for row in (exercise_record(item[1], raw) for raw in found.get(i, []))
+                    if not isodate(row["date"]) or isodate(row["date"]) >= start]
+            yield k, item, {"DB": rows, "EX": None, "EX_queried": False} # EX: keep the cached price history
+
+    def _sweep(self, excel, pending, from_date, to_date):
+        chunks = date_chunks(from_date, to_date, self.config["sweep_days"])
+        self.log(f"전체 행사내역을 {len(chunks)}개 기간으로 나누어 조회합니다. ({from_date} ~ {to_date})")
+        raw_rows = []
+        for chunk_from, chunk_to in chunks:
+            if not self.running: return {}, set(pending)
+            try: rows = fetch_sweep(self.scraper, chunk_from, chunk_to)
+            except BlockedError: raise
+            except Exception as e:
+                self.log(f"전체 조회에 실패했습니다: {e}")
+                rows = None
+            if rows is None:
+                self.log("전체 조회 결과가 불완전하여 채권별로 조회합니다.")
+                return {}, set(pending)
+            raw_rows.extend(rows)
+        if not raw_rows: # nothing at all is more likely a failed query than a quiet market: confirm per bond
+            self.log("전체 조회 결과가 없어 채권별로 조회합니다.")
+            self.summary["sweep"] = {"queries": len(chunks), "rows": 0, "attributed": 0, "fallback": len(pending)}
+            return {}, set(pending)
+        found, fallback = attribute(raw_rows, [(i, excel[i]) for i in pending], self.resolver)
+        self.summary["sweep"] = {"queries": len(chunks), "rows": len(raw_rows), "attributed": len(found), "fallback": len(fallback)}
+        self.log(f"전체 조회 {len(raw_rows)}건 중 {len(found)}개 채권에 배분했습니다. (개별 조회 {len(fallback)}개)")
+        return found, fallback
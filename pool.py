@@ -0,0 +1,163 @@
+import os
+import tempfile
+import multiprocessing
+import queue as queue_module
+
+from utilitylib.ratelimit import SharedRateGovernor, BlockedError, ScrapeCancelled
+
+def _worker(index, tasks, results, governor, headless, profile_dir, debug_port, base_url=None, resolver_path=None,
+            network_filter=None, capture=None, timers_path=None, cancel=None, holding=None):
+    # One Chrome per process, drawing from the shared request budget.
+    # holding[index] is the first position of the company being scraped; shared memory rather than a message
+    # so it survives a worker that dies before its queue is flushed
+    from pipeline import fetch_company
+    from resolver import IsinResolver
+    from seibro_browser import use_base_url
+    from utilitylib.driver import TableScraper
+    from utilitylib.timing import AdaptiveTimers
+
+    if base_url: use_base_url(base_url) # module state is not inherited by spawned processes
+    adaptive = AdaptiveTimers(timers_path).load() if timers_path else None # samples go back to the parent, which saves them
+    scraper = TableScraper(headless=headless, governor=governor, profile_dir=profile_dir, debug_port=debug_port,
+                           network_filter=network_filter, capture=capture, adaptive=adaptive)
+    if cancel is not None: scraper.cancel = cancel # the parent's Stop interrupts the current company
+    resolver = IsinResolver(resolver_path).load() # read-only in workers; the parent owns the index file
+    try:
+        while True:
+            task = tasks.get()
+            if task is None: break
+            positions, corp_name, bonds, to_date, prices = task
+            if holding is not None: holding[index] = positions[0] # the parent hands the company to another worker if this one dies
+            found, entries, error = None, None, None
+            try:
+                found = fetch_company(scraper, corp_name, bonds, to_date, resolver=resolver, prices=prices)
+                entries = [resolver.get(corp_name, bond_name) for bond_name, _ in bonds]
+            except ScrapeCancelled: error = ("cancelled", f"worker {index}: stopped")
+            except BlockedError as e: error = ("blocked", f"worker {index}: {e}") # ends the run, unlike a failure of this one company
+            except Exception as e: error = ("failed", f"worker {index}: {e}")
+            results.put((index, positions, found, entries, adaptive.drain() if adaptive else None, error))
+            if error and error[0] == "cancelled": break
+    finally:
+        scraper.cleanup()
+
+class BrowserPool:
+    '''
+    N browser worker processes, each with its own profile dir and debugging port,
+    sharing one SharedRateGovernor so the total request rate stays within the safe limit.
+    Setting 'cancel_event' (the run's Stop) interrupts the workers inside their current company.
+    '''
+    def __init__(self, workers: int = 2, headless: bool = True, governor: SharedRateGovernor = None,
+                 base_port: int = 9300, profile_root: str = None, base_url: str = None, resolver_path: str = None,
+                 network_filter=None, capture: str = None, timers=None, cancel_event=None):
+        self.ctx = multiprocessing.get_context("spawn") # a forked Tk/Chrome parent is not safe to copy
+        self.workers = workers
+        self.headless = headless
+        self.governor = governor or SharedRateGovernor(self.ctx)
+        self.base_port = base_port
+        self.profile_root = profile_root or os.path.join(tempfile.gettempdir(), "kind-pool")
+        self.base_url = base_url
+        self.resolver_path = resolver_path
+        self.network_filter = network_filter # None: the default NetworkFilter, False: load everything
+        self.capture = capture # TableScraper capture mode pattern
+        self.timers = timers # AdaptiveTimers: workers start from its file and their samples are merged into it
+        self.cancel_event = cancel_event # the caller's threading.Event, relayed to the workers through self.cancel
+        self.cancel = self.ctx.Event()
+        self.holding = None
+        self.tasks = None
+        self.results = None
+        self.processes = []
+
+    def start(self):
+        if self.processes: return self
+        self.cancel.clear() # set by a previous cleanup()
+        self.tasks, self.results = self.ctx.Queue(), self.ctx.Queue()
+        self.holding = self.ctx.Array("i", [-1] * self.workers, lock=False) # one writer per slot
+        for i in range(self.workers):
+            profile_dir = os.path.join(self.profile_root, f"worker{i}")
+            process = self.ctx.Process(
+                target=_worker,
+                args=(i, self.tasks, self.results, self.governor, self.headless, profile_dir, self.base_port + i,
+                      self.base_url, self.resolver_path, self.network_filter, self.capture,
+                      self.timers.path if self.timers else None, self.cancel, self.holding),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def is_alive(self):
+        return any(p.is_alive() for p in self.processes)
+
+    def map(self, items, from_date, to_date: str, resolver=None, prices: bool = True):
+        '''
+        Scrape every [bond_name, company] in 'items' and yield (position, item, {"DB": rows, "EX": prices}) in input order.
+        A company's bonds go to one worker together, so one ISIN search covers all of them.
+        'from_date' is one date for all items or a list with one start date per item.
+        ISIN index entries found by the workers are written into 'resolver', their latency samples into 'timers'.
+        A company that fails yields {"DB": None, "EX": None, "error": the worker's message} for each of its bonds;
+        a worker that stays blocked raises BlockedError, a set 'cancel_event' raises ScrapeCancelled.
+        A company whose worker process dies is handed to another worker once, then reported as failed.
+        '''
+        self.start()
+        from_dates = from_date if isinstance(from_date, (list, tuple)) else [from_date] * len(items)
+        groups, task_of = {}, {}
+        for pos, item in enumerate(items): groups.setdefault(item[1], []).append(pos)
+        for corp_name, positions in groups.items():
+            task_of[positions[0]] = (positions, corp_name, [(items[pos][0], from_dates[pos]) for pos in positions], to_date, prices)
+            self.tasks.put(task_of[positions[0]])
+
+        done, next_pos = {}, 0
+        retried = set() # companies already handed to another worker once
+        while next_pos < len(items):
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                self.cancel.set()
+                raise ScrapeCancelled()
+            try: self._record(self.results.get(timeout=1), items, resolver, next_pos, done)
+            except queue_module.Empty: self._recover(items, retried, task_of, done)
+            while next_pos in done: # release results in input order
+                result, error = done.pop(next_pos)
+                if error and error[0] == "blocked": raise BlockedError(error[1])
+                if error and error[0] == "cancelled": raise ScrapeCancelled()
+                if error: result = {"DB": None, "EX": None, "error": error[1]}
+                yield next_pos, items[next_pos], result
+                next_pos += 1
+
+    def _record(self, message, items, resolver, next_pos, done):
+        index, positions, found, entries, samples, error = message
+        if self.holding[index] == positions[0]: self.holding[index] = -1
+        if positions[0] < next_pos or positions[0] in done: return # a handed-on company reported twice
+        if self.timers and samples: self.timers.merge(samples)
+        for k, pos in enumerate(positions):
+            if resolver is not None and entries and entries[k]:
+                item = items[pos]
+                resolver.put(item[1], item[0], **entries[k])
+            done[pos] = (found[k] if found else None, error)
+
+    def _recover(self, items, retried, task_of, done):
+        # A worker process that died took its company with it: queue the company again once, then give up on it
+        for index, process in enumerate(self.processes):
+            first = self.holding[index]
+            if first < 0 or process.is_alive(): continue
+            self.holding[index] = -1
+            positions, corp_name = task_of[first][0], task_of[first][1]
+            if first in retried:
+                for pos in positions: done[pos] = (None, ("failed", f"worker {index} exited while scraping {corp_name}"))
+            else:
+                print(f"Worker {index} exited while scraping {corp_name}, handing it to another worker")
+                retried.add(first)
+                self.tasks.put(task_of[first])
+        if not self.is_alive(): raise RuntimeError("all browser workers exited")
+
+    def cleanup(self):
+        if not self.processes: return
+        self.cancel.set() # a worker still inside a company (Stop, error) stops there instead of finishing it
+        try: # drop companies not picked up yet
+            while True: self.tasks.get_nowait()
+        except Exception: pass
+        for _ in self.processes:
+            try: self.tasks.put(None)
+            except Exception: pass
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive(): process.terminate()
+        self.processes = []
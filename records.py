@@ -0,0 +1,57 @@
+# Record helpers shared by the browser (seibro_browser.py) and HTTP (seibro_http.py) backends
+
+DB_COLUMNS = ["title", "date", "exc_amount", "exc_shares", "exc_price", "listing_date"]
+EX_COLUMNS = ["title", "date", "prv_prc", "cur_prc"]
+
+# Column types of the typed (CSV / NDJSON / Parquet) outputs: "str", "float" or "date" (ISO 'YYYY-MM-DD')
+COLUMN_TYPES = {
+    "title": "str",
+    "date": "date",
+    "exc_amount": "float",
+    "exc_shares": "float",
+    "exc_price": "float",
+    "listing_date": "date",
+    "prv_prc": "float",
+    "cur_prc": "float",
+}
+
+def fmtkey(key):
+    key=str(key).replace(' ','')
+    types_str = [
+        'EB', 'eb',
+        'CB', 'cb',
+        'BW', 'bw',
+    ]
+    for abbr in types_str: key=key.replace(abbr,'')
+    idx=key.find('(')
+    if idx!=-1: key=key[:idx]
+    return key
+
+def to_number(text):
+    # '1,234.5' -> 1234.5, empty -> None
+    if text is None: return None
+    text = str(text).replace(',', '').strip()
+    return float(text) if text else None
+
+def fmtdate(text):
+    # '20230105' -> '2023/01/05' (the grid's display format); other formats are kept as-is
+    text = str(text or '').strip()
+    if len(text) == 8 and text.isdigit(): return f"{text[:4]}/{text[4:6]}/{text[6:]}"
+    return text
+
+def isodate(text):
+    # '2023/01/05', '20230105', '2023.01.05' -> '2023-01-05', empty -> None
+    digits = str(text or '').replace('/', '').replace('-', '').replace('.', '').strip()
+    if len(digits) == 8 and digits.isdigit(): return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+    return digits or None
+
+def typed_row(row, columns):
+    # Row dict restricted to 'columns', each value converted to its COLUMN_TYPES type
+    result = {}
+    for col in columns:
+        kind, value = COLUMN_TYPES.get(col, "str"), row.get(col)
+        if kind == "float": value = to_number(value)
+        elif kind == "date": value = isodate(value)
+        elif value is not None: value = str(value)
+        result[col] = value
+    return result
@@ -0,0 +1,88 @@
+import os
+import json
+import tempfile
+
+from records import fmtkey
+from export_results import _default_output_path
+
+class IsinResolver:
+    '''
+    Persistent index from (company, fmtkey bond key) to the bond's ISIN and popup row identity.
+    An entry may also hold 'selection': the main-page input values the popup wrote when the bond
+    was picked, so later runs can restore them instead of opening the popup. A selection that failed to
+    select its bond marks the entry "restorable": False (never stored again) and stops restores for the run.
+    '''
+    def __init__(self, path: str = None):
+        self.path = path or _default_output_path("results_isin.json")
+        self.entries = {}
+        self.dirty = False
+        self.restore = True # False once a restored selection missed its bond in this run
+
+    @staticmethod
+    def key(company: str, bond_name: str) -> str:
+        return f"{company}|{fmtkey(bond_name)}"
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError: self.entries = {}
+        except Exception as e:
+            print(f"Failed to load ISIN index, starting empty: {e}")
+            self.entries = {}
+        return self
+
+    def save(self):
+        if not self.dirty: return self.path
+        output_dir = os.path.dirname(self.path) or "."
+        os.makedirs(output_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".json", prefix=".isin-", dir=output_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        return self.path
+
+    def get(self, company: str, bond_name: str):
+        return self.entries.get(self.key(company, bond_name))
+
+    def put(self, company: str, bond_name: str, isin: str = "", name: str = "", row: int = None, selection: dict = None,
+            restorable: bool = None):
+        entry = self.entries.setdefault(self.key(company, bond_name), {})
+        if isin: entry["isin"] = isin
+        if name: entry["name"] = name
+        if row is not None: entry["row"] = row
+        if restorable is False:
+            entry["restorable"] = False
+            entry.pop("selection", None)
+        if selection and entry.get("restorable", True): entry["selection"] = selection
+        self.dirty = True
+        return entry
+
+    def forget_selection(self, company: str, bond_name: str):
+        # A restored selection did not select the bond: drop it, keep the ISIN, and stop restoring (see 'restore')
+        self.restore = False
+        entry = self.get(company, bond_name)
+        if entry is None: return
+        entry.pop("selection", None)
+        entry["restorable"] = False
+        self.dirty = True
+
+    def forget(self, company: str, bond_name: str):
+        if self.entries.pop(self.key(company, bond_name), None) is not None: self.dirty = True
+
+    def match(self, company: str, bond_name: str, candidates: list):
+        '''
+        Pick the wanted bond from popup 'candidates' [(name, isin)]: the indexed ISIN first, then the fmtkey name.
+        Returns (position, name, isin) or None. Several name matches resolve to the first one.
+        '''
+        entry = self.get(company, bond_name) or {}
+        if entry.get("isin"):
+            for pos, (name, isin) in enumerate(candidates):
+                if isin and isin == entry["isin"]: return pos, name, isin
+        wanted = fmtkey(bond_name)
+        matches = [pos for pos, (name, _) in enumerate(candidates) if fmtkey(name) == wanted]
+        if len(matches) > 1: print(f"Multiple matches found for {bond_name}, using the first")
+        if not matches: return None
+        pos = matches[0]
+        return pos, candidates[pos][0], candidates[pos][1]
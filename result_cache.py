@@ -0,0 +1,88 @@
+import os
+import json
+import tempfile
+
+from records import fmtkey
+from export_results import _default_output_path
+
+def _day(text) -> str:
+    # '2023/01/05', '2023-01-05', '20230105' -> '20230105'
+    return str(text or "").replace("/", "").replace("-", "").replace(".", "").strip()
+
+class ResultCache:
+    '''
+    On-disk cache of exercise rows keyed by (company, bond key, date).
+    Remembers the last date each bond was scraped up to, so a run only queries the window since then.
+    '''
+    def __init__(self, path: str = None):
+        self.path = path or _default_output_path("results_cache.json")
+        self.bonds = {} # "company|bond key" -> {"last_date": "YYYYMMDD", "days": {"YYYYMMDD": [rows]}, "prices": [rows]}
+        self.dirty = False
+
+    @staticmethod
+    def key(company: str, bond_name: str) -> str:
+        return f"{company}|{fmtkey(bond_name)}"
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.bonds = json.load(f).get("bonds", {})
+        except FileNotFoundError: self.bonds = {}
+        except Exception as e:
+            print(f"Failed to load cache, starting empty: {e}")
+            self.bonds = {}
+        return self
+
+    def save(self):
+        if not self.dirty: return self.path
+        output_dir = os.path.dirname(self.path) or "."
+        os.makedirs(output_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".json", prefix=".cache-", dir=output_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "bonds": self.bonds}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        return self.path
+
+    def since(self, company: str, bond_name: str, default: str) -> str:
+        '''
+        Start of the query window: the last scraped date (inclusive, to pick up late entries) or 'default'.
+        '''
+        entry = self.bonds.get(self.key(company, bond_name))
+        if not entry or not entry.get("last_date"): return default
+        return max(entry["last_date"], default)
+
+    def merge(self, company: str, bond_name: str, rows: list, from_date: str, to_date: str):
+        '''
+        Replace the cached rows of every day in [from_date, to_date] with the freshly scraped 'rows'.
+        'rows' None (a scrape that failed or was not confirmed) leaves the window and last date untouched.
+        '''
+        if rows is None: return
+        entry = self.bonds.setdefault(self.key(company, bond_name), {"last_date": "", "days": {}})
+        from_day, to_day = _day(from_date), _day(to_date)
+        days = {day: r for day, r in entry["days"].items() if not from_day <= day <= to_day}
+        for row in rows:
+            days.setdefault(_day(row.get("date")), []).append(row)
+        entry["days"] = days
+        entry["last_date"] = max(entry["last_date"], to_day)
+        self.dirty = True
+
+    def rows(self, company: str, bond_name: str) -> list:
+        '''
+        Full cached history of a bond, oldest first.
+        '''
+        entry = self.bonds.get(self.key(company, bond_name))
+        if not entry: return []
+        return [row for day in sorted(entry["days"]) for row in entry["days"][day]]
+
+    def set_prices(self, company: str, bond_name: str, rows: list):
+        '''
+        Replace the cached exercise-price history of a bond (it is always scraped in full).
+        '''
+        entry = self.bonds.setdefault(self.key(company, bond_name), {"last_date": "", "days": {}})
+        entry["prices"] = list(rows)
+        self.dirty = True
+
+    def prices(self, company: str, bond_name: str) -> list:
+        entry = self.bonds.get(self.key(company, bond_name))
+        return list(entry.get("prices", [])) if entry else []
@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import sqlite3
+
+from records import fmtkey, fmtdate
+from export_results import _default_output_path, MultiSink
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bonds (
+    title TEXT NOT NULL, bond_key TEXT NOT NULL, bond_name TEXT, last_date TEXT,
+    PRIMARY KEY (title, bond_key));
+CREATE TABLE IF NOT EXISTS exercises (
+    title TEXT NOT NULL, bond_key TEXT NOT NULL, date TEXT NOT NULL, listing_date TEXT NOT NULL, seq INTEGER NOT NULL,
+    exc_amount REAL, exc_shares REAL, exc_price REAL, updated TEXT,
+    PRIMARY KEY (title, bond_key, date, listing_date, seq));
+CREATE TABLE IF NOT EXISTS prices (
+    title TEXT NOT NULL, bond_key TEXT NOT NULL, date TEXT NOT NULL, seq INTEGER NOT NULL,
+    prv_prc REAL, cur_prc REAL, updated TEXT,
+    PRIMARY KEY (title, bond_key, date, seq));
+CREATE INDEX IF NOT EXISTS exercises_by_date ON exercises (date);
+CREATE INDEX IF NOT EXISTS prices_by_date ON prices (date);
+"""
+# The primary keys start with title, so they double as the by-company indexes
+
+UPSERT_EXERCISE = """
+INSERT INTO exercises (title, bond_key, date, listing_date, seq, exc_amount, exc_shares, exc_price, updated)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (title, bond_key, date, listing_date, seq) DO UPDATE SET
+    exc_amount = excluded.exc_amount, exc_shares = excluded.exc_shares, exc_price = excluded.exc_price, updated = excluded.updated
+"""
+UPSERT_PRICE = """
+INSERT INTO prices (title, bond_key, date, seq, prv_prc, cur_prc, updated) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (title, bond_key, date, seq) DO UPDATE SET
+    prv_prc = excluded.prv_prc, cur_prc = excluded.cur_prc, updated = excluded.updated
+"""
+UPSERT_BOND = """
+INSERT INTO bonds (title, bond_key, bond_name, last_date) VALUES (?, ?, ?, ?)
+ON CONFLICT (title, bond_key) DO UPDATE SET
+    bond_name = excluded.bond_name, last_date = MAX(COALESCE(bonds.last_date, ''), excluded.last_date)
+"""
+
+def _iso(text) -> str:
+    # '2023/01/05', '2023-01-05', '20230105' -> '2023-01-05' (sortable); other values are kept as-is
+    day = str(text or "").replace("/", "").replace("-", "").replace(".", "").strip()
+    return f"{day[:4]}-{day[4:6]}-{day[6:]}" if len(day) == 8 and day.isdigit() else day
+
+def _display(text) -> str:
+    # '2023-01-05' -> '2023/01/05', the format the sheets use
+    return fmtdate(str(text or "").replace("-", ""))
+
+def _numbered(keys: list):
+    # Ordinal of each row among the rows sharing its key, so same-day exercises stay separate rows
+    seen = {}
+    for key in keys:
+        seen[key] = seen.get(key, -1) + 1
+        yield seen[key]
+
+def _same(stored: list, fresh: list) -> bool:
+    # Whether freshly scraped rows hold the stored values, in any order; numbers compare as the REAL columns keep them
+    def cell(value):
+        try: return float(value)
+        except (TypeError, ValueError): return value
+    normal = lambda rows: sorted((tuple(cell(v) for v in row) for row in rows), key=repr)
+    return normal(stored) == normal(fresh)
+
+class ResultStore:
+    '''
+    SQLite store of exercise rows and exercise-price series, keyed on (title, bond key, date, listing_date)
+    plus an ordinal for rows sharing that key. Same interface as ResultCache (since / merge / rows /
+    set_prices / prices / save), so a run can use either; the sheets and files are exported from it.
+    Writes are queued and applied in one transaction per 'batch_size' rows (WAL mode, so readers are not blocked).
+    '''
+    def __init__(self, path: str = None, batch_size: int = 500):
+        self.path = path or _default_output_path("results.sqlite")
+        self.batch_size = batch_size
+        self.conn = None
+        self.pending = [] # (sql, params or [params]) applied together by flush()
+        self.pending_rows = 0
+
+    def load(self, legacy_cache: str = None):
+        '''
+        Open (or create) the database. An empty store imports 'legacy_cache' (results_cache.json) if present.
+        '''
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL") # durable at each checkpoint; WAL keeps the file consistent
+        self.conn.executescript(SCHEMA)
+        if legacy_cache and os.path.exists(legacy_cache) and not self.conn.execute("SELECT 1 FROM bonds LIMIT 1").fetchone():
+            self.import_cache(legacy_cache)
+        return self
+
+    def import_cache(self, path: str):
+        try:
+            with open(path, "r", encoding="utf-8") as f: bonds = json.load(f).get("bonds", {})
+        except Exception as e:
+            print(f"Failed to import cache {path}: {e}")
+            return
+        for key, entry in bonds.items():
+            company, bond_key = key.split("|", 1)
+            rows = [row for day in sorted(entry.get("days", {})) for row in entry["days"][day]]
+            self._queue_rows(company, bond_key, bond_key, rows, None, None, entry.get("last_date") or "")
+            if entry.get("prices"): self.set_prices(company, bond_key, entry["prices"])
+        self.save()
+        print(f"Imported {len(bonds)} bonds from {path}")
+
+    def save(self):
+        self.flush()
+        return self.path
+
+    def close(self):
+        if self.conn is None: return self.path
+        self.flush()
+        self.conn.close()
+        self.conn = None
+        return self.path
+
+    def flush(self):
+        # Apply the queued writes in one transaction
+        if not self.pending: return
+        with self.conn:
+            for sql, params in self.pending:
+                if isinstance(params, list): self.conn.executemany(sql, params)
+                else: self.conn.execute(sql, params)
+        self.pending, self.pending_rows = [], 0
+
+    def _queue(self, sql, params, rows: int = 0):
+        self.pending.append((sql, params))
+        self.pending_rows += rows
+        if self.pending_rows >= self.batch_size: self.flush()
+
+    def since(self, company: str, bond_name: str, default: str) -> str:
+        '''
+        Start of the query window: the last scraped date (inclusive, to pick up late entries) or 'default'.
+        '''
+        self.flush()
+        found = self.conn.execute("SELECT last_date FROM bonds WHERE title = ? AND bond_key = ?",
+                                  (company, fmtkey(bond_name))).fetchone()
+        if not found or not found[0]: return default
+        return max(found[0], default)
+
+    def merge(self, company: str, bond_name: str, rows: list, from_date: str, to_date: str):
+        '''
+        Replace the stored rows of every day in [from_date, to_date] with the freshly scraped 'rows'.
+        'rows' None (a scrape that failed or was not confirmed) leaves the window and last date untouched.
+        A window that comes back unchanged is not rewritten, so its rows keep their 'updated' time.
+        '''
+        if rows is None: return
+        bond_key = fmtkey(bond_name)
+        stored = self.conn.execute( # a bond is merged once per run, so none of its own writes are pending here
+            "SELECT date, listing_date, exc_amount, exc_shares, exc_price FROM exercises "
+            "WHERE title = ? AND bond_key = ? AND date BETWEEN ? AND ?", (company, bond_key, _iso(from_date), _iso(to_date))).fetchall()
+        fresh = [(_iso(row.get("date")), _iso(row.get("listing_date")), row.get("exc_amount"), row.get("exc_shares"), row.get("exc_price"))
+                 for row in rows]
+        if _same(stored, fresh):
+            self._queue(UPSERT_BOND, (company, bond_key, bond_name, to_date))
+            return
+        self._queue_rows(company, bond_key, bond_name, rows, from_date, to_date, to_date)
+
+    def _queue_rows(self, company, bond_key, bond_name, rows, from_date, to_date, last_date):
+        if from_date and to_date:
+            self._queue("DELETE FROM exercises WHERE title = ? AND bond_key = ? AND date BETWEEN ? AND ?",
+                        (company, bond_key, _iso(from_date), _iso(to_date)))
+        updated = time.strftime("%Y-%m-%d %H:%M:%S")
+        keys = [(_iso(row.get("date")), _iso(row.get("listing_date"))) for row in rows]
+        params = [(company, bond_key, day, listing_date, seq, row.get("exc_amount"), row.get("exc_shares"), row.get("exc_price"), updated)
+                  for row, (day, listing_date), seq in zip(rows, keys, _numbered(keys))]
+        self._queue(UPSERT_BOND, (company, bond_key, bond_name, last_date))
+        self._queue(UPSERT_EXERCISE, params, len(params))
+
+    def rows(self, company: str, bond_name: str) -> list:
+        '''
+        Full stored history of a bond, oldest first.
+        '''
+        return self.query("DB", company, bond_name)
+
+    def set_prices(self, company: str, bond_name: str, rows: list):
+        '''
+        Replace the stored exercise-price series of a bond (it is always scraped in full); an unchanged series is left as is.
+        '''
+        bond_key, updated = fmtkey(bond_name), time.strftime("%Y-%m-%d %H:%M:%S")
+        keys = [_iso(row.get("date")) for row in rows]
+        stored = self.conn.execute("SELECT date, prv_prc, cur_prc FROM prices WHERE title = ? AND bond_key = ?",
+                                   (company, bond_key)).fetchall()
+        fresh = [(day, row.get("prv_prc"), row.get("cur_prc")) for row, day in zip(rows, keys)]
+        if stored and _same(stored, fresh): return
+        self._queue("DELETE FROM prices WHERE title = ? AND bond_key = ?", (company, bond_key))
+        self._queue(UPSERT_PRICE, [(company, bond_key, day, seq, row.get("prv_prc"), row.get("cur_prc"), updated)
+                                   for row, day, seq in zip(rows, keys, _numbered(keys))], len(rows))
+
+    def prices(self, company: str, bond_name: str) -> list:
+        return self.query("EX", company, bond_name)
+
+    def query(self, sheet_name: str = "DB", company: str = None, bond_name: str = None,
+              from_date: str = None, to_date: str = None, since: str = None) -> list:
+        '''
+        Stored rows of a sheet ("DB" exercises, "EX" prices) in the sheets' record format, filtered by company,
+        bond, date range (YYYYMMDD, inclusive) and 'since' (rows written at or after that "YYYY-MM-DD HH:MM:SS"),
+        ordered by company, bond and date.
+        '''
+        self.flush()
+        table, columns = ("exercises", "date, exc_amount, exc_shares, exc_price, listing_date") if sheet_name == "DB" \
+            else ("prices", "date, prv_prc, cur_prc")
+        where, params = [], []
+        if company is not None: where.append("title = ?"); params.append(company)
+        if bond_name is not None: where.append("bond_key = ?"); params.append(fmtkey(bond_name))
+        if from_date: where.append("date >= ?"); params.append(_iso(from_date))
+        if to_date: where.append("date <= ?"); params.append(_iso(to_date))
+        if since: where.append("updated >= ?"); params.append(since)
+        sql = f"SELECT title, {columns} FROM {table}" + (f" WHERE {' AND '.join(where)}" if where else "") \
+            + " ORDER BY title, bond_key, date, seq"
+        cursor = self.conn.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, values)) for values in cursor]
+        for row in rows:
+            for col in ("date", "listing_date"):
+                if col in row: row[col] = _display(row[col])
+        return rows
+
+    def export(self, sink, items: list = None, since: str = None) -> dict:
+        '''
+        Write the stored rows of 'items' ([bond_name, company], default: every bond) to 'sink', replacing its
+        DB and EX sheets. Returns the row count per sheet.
+        With 'since', append-only sinks (append_only = True, e.g. GcsSink; also inside a MultiSink) cannot be
+        replaced and get only the rows written since then, counted under "changed".
+        '''
+        bonds = [(company, bond_name) for bond_name, company in items] if items is not None else \
+            self.conn.execute("SELECT title, bond_key FROM bonds ORDER BY title, bond_key").fetchall()
+        sinks = sink.sinks if isinstance(sink, MultiSink) else (sink,)
+        appended = [s for s in sinks if since and getattr(s, "append_only", False)]
+        replaced = [s for s in sinks if s not in appended]
+        for s in replaced: s.clear("DB", "EX")
+        counts, changed = {"DB": 0, "EX": 0}, {"DB": 0, "EX": 0}
+        for company, bond_name in bonds:
+            for sheet_name in counts:
+                rows = self.query(sheet_name, company, bond_name)
+                for s in replaced:
+                    if rows: s.add(rows, sheet_name)
+                counts[sheet_name] += len(rows)
+                if not appended: continue
+                rows = self.query(sheet_name, company, bond_name, since=since)
+                for s in appended:
+                    if rows: s.add(rows, sheet_name)
+                changed[sheet_name] += len(rows)
+        if appended: counts["changed"] = changed
+        return counts
@@ -0,0 +1,432 @@
+import re
+
+from utilitylib.driver import frame_loaded, items_present, element_hidden, table_rendered, response_captured, first_of
+from utilitylib.websquare import SERVICE_PATH, build_request, parse_request, parse_response
+from utilitylib.tracing import TRACER
+from records import to_number, isodate
+from resolver import IsinResolver
+from seibro_http import QUERIES, query_params, exercise_record, price_record
+
+SEIBRO_URL = "https://seibro.or.kr"
+
+selectors = {
+    "details_url": SEIBRO_URL + "/websquare/control.jsp?w2xPath=/IPORTAL/user/bond/BIP_CNTS03024V.xml&menuNo=416",
+    "prc_url": SEIBRO_URL + "/websquare/control.jsp?w2xPath=/IPORTAL/user/bond/BIP_CNTS03025V.xml&menuNo=417",
+    "corp_search_btn": "#bd_input2_image1",
+    "corp_input": "#search_string",
+    "corp_search": "#image2",
+    "popup_frame": "#iframeIsin",
+    "from_date_selector": "#inputCalendar1_input",
+    "to_date_selector": "#inputCalendar2_input", 
+    "isin_items": '#isinList [id^="isinList_"][id$="_group178"]',
+    "grid_id": "grid1",
+    "grid_body": "#grid1_body_tbody",
+    "next_page_btn": "#gridPaging_next_btn",
+}
+
+# TableScraper capture mode: keep the responses of the WebSquare service calls the grid is filled from
+CAPTURE_PATTERN = re.escape(SERVICE_PATH)
+
+def use_base_url(base_url: str):
+    # Point the page URLs at another host serving the same paths (e.g. the local mock site)
+    for key in ("details_url", "prc_url"):
+        path = selectors[key].split("/websquare/", 1)[1]
+        selectors[key] = base_url.rstrip("/") + "/websquare/" + path
+
+# Popup search results in one call: [[row index, bond name, ISIN], ...]
+POPUP_LIST_SCRIPT = """
+var items = document.querySelectorAll(arguments[0]);
+var result = [];
+for (var i = 0; i < items.length; i++) {
+  var idx = parseInt(items[i].id.split('_')[1], 10);
+  var row = document.getElementById('isinList_' + idx + '_ISIN_ROW');
+  var isin = row ? (row.textContent.match(/KR[0-9A-Z]{10}/) || [''])[0] : '';
+  result.push([idx, items[i].textContent.trim(), isin]);
+}
+return result;
+"""
+
+# Snapshot / restore of the main page's input values, used to replay a popup selection
+INPUTS_SCRIPT = """
+var result = {};
+var inputs = document.querySelectorAll('input[id]');
+for (var i = 0; i < inputs.length; i++) result[inputs[i].id] = inputs[i].value;
+return result;
+"""
+RESTORE_SCRIPT = """
+var values = arguments[0];
+for (var id in values) { if (!document.getElementById(id)) return false; }
+for (var id in values) {
+  var el = document.getElementById(id);
+  el.value = values[id];
+  el.dispatchEvent(new Event('change', {bubbles: true}));
+}
+return true;
+"""
+# Reading the inputs back cannot show whether WebSquare's own selection changed, so a restored selection is
+# only trusted once the exercise query it sends carries the bond's ISIN (see requested_isin)
+ISIN_PARAM = next(key for key, value in QUERIES["exercise_history"]["params"].items() if value == "{isin}")
+
+def search_popup(driver, corp_name):
+    # Open the ISIN popup, search 'corp_name' and leave the driver inside the popup frame
+    driver.click_button(selectors["corp_search_btn"], until=frame_loaded(selectors["popup_frame"]), name="frame")
+
+    driver.fill_input(selectors["corp_input"], corp_name, selectors["popup_frame"])
+
+    driver.click_button(selectors["corp_search"], selectors["popup_frame"],
+                        until=items_present(selectors["isin_items"]), name="items")
+
+    driver.switch_to_frame(selectors["popup_frame"])
+
+# corp_input value and number of listed bonds of the popup, to tell whether it still shows a search result
+POPUP_STATE_SCRIPT = """
+var input = document.querySelector(arguments[0]);
+return [input ? input.value : '', document.querySelectorAll(arguments[1]).length];
+"""
+
+def show_popup_list(driver, corp_name):
+    # Popup search result for 'corp_name', searched again only if the popup does not still show it;
+    # leaves the driver inside the popup frame
+    if element_hidden(selectors["popup_frame"])(driver.driver):
+        driver.click_button(selectors["corp_search_btn"], until=frame_loaded(selectors["popup_frame"]), name="frame")
+    driver.switch_to_frame(selectors["popup_frame"])
+    try: value, count = driver.driver.execute_script(POPUP_STATE_SCRIPT, selectors["corp_input"], selectors["isin_items"])
+    except Exception: value, count = "", 0
+    if value.strip() == corp_name and count: return
+    driver.switch_to_default()
+    search_popup(driver, corp_name)
+
+def select_listed(driver, resolver, corp_name, bond_name, buffer=None):
+    # Select a bond of the company's popup list on the loaded page (no page load); its ISIN, None if not listed
+    show_popup_list(driver, corp_name)
+    try: listed = driver.driver.execute_script(POPUP_LIST_SCRIPT, selectors["isin_items"]) or []
+    except Exception: listed = []
+    match = resolver.match(corp_name, bond_name, [(name, isin) for _, name, isin in listed])
+    if not match:
+        driver.switch_to_default()
+        return None
+    pos, name, isin = match
+    driver.click_button(f"#isinList_{listed[pos][0]}_ISIN_ROW", settle=False)
+    driver.switch_to_default()
+    driver.wait_for(element_hidden(selectors["popup_frame"]), "hidden", fallback=buffer)
+    return isin
+
+def resolve_company(driver, resolver, corp_name, bond_names, max_tries=3, buffer=None):
+    # ISINs of several bonds of one company (None where unresolved) from at most one popup search
+    isins = {bond_name: (resolver.get(corp_name, bond_name) or {}).get("isin") for bond_name in bond_names}
+    missing = [bond_name for bond_name in bond_names if not isins[bond_name]]
+    if not missing: return [isins[bond_name] for bond_name in bond_names] # all indexed: no popup
+
+    search_popup(driver, corp_name)
+    with TRACER.span("isin_search"):
+        for attempt in range(max_tries):
+            try:
+                listed = driver.driver.execute_script(POPUP_LIST_SCRIPT, selectors["isin_items"]) or []
+                candidates = [(name, isin) for _, name, isin in listed]
+                for bond_name in missing:
+                    match = resolver.match(corp_name, bond_name, candidates)
+                    if not match: continue
+                    pos, name, isin = match
+                    resolver.put(corp_name, bond_name, isin=isin, name=name, row=listed[pos][0])
+                    isins[bond_name] = isin
+                missing = [bond_name for bond_name in missing if not isins[bond_name]]
+                if not missing: break
+                print(f"No matches found for {len(missing)} bonds, retrying... ({attempt + 1}/{max_tries})")
+            except Exception as e:
+                if not driver.is_alive(): raise RuntimeError("Chrome session lost during ISIN search") from e
+                print(f"Error reading search results, retrying... {e}")
+            driver.wait_for(items_present(selectors["isin_items"]), "items", fallback=buffer)
+    driver.switch_to_default()
+    for bond_name in missing: print(f"Unresolved: {bond_name} not found in {corp_name} search results")
+    return [isins[bond_name] for bond_name in bond_names]
+
+def resolve_isin(driver, resolver, corp_name, bond_name, max_tries=3, buffer=None, restore=True):
+    # Select the bond on the details page. Returns the resolver entry, or None if it stays unresolved.
+    # A restored selection comes back with "restored": True and has to be checked with requested_isin;
+    # it is only tried in capture mode, where the query's request can be read, and not after one missed in this run
+    entry = resolver.get(corp_name, bond_name)
+    if (restore and resolver.restore and entry and entry.get("selection") and entry.get("isin")
+            and getattr(driver, "capture_pattern", None)):
+        if driver.driver.execute_script(RESTORE_SCRIPT, entry["selection"]):
+            print(f"Restored indexed selection: {entry.get('name')} {entry.get('isin', '')}")
+            return {**entry, "restored": True} # popup skipped
+        print("Indexed selection could not be restored, searching again")
+
+    before = driver.driver.execute_script(INPUTS_SCRIPT)
+    search_popup(driver, corp_name)
+    match = None
+    with TRACER.span("isin_search"):
+        for attempt in range(max_tries): # bounded: an unknown name must not hang the run
+            try:
+                listed = driver.driver.execute_script(POPUP_LIST_SCRIPT, selectors["isin_items"]) or []
+                match = resolver.match(corp_name, bond_name, [(name, isin) for _, name, isin in listed])
+                if match: break
+                print(f"No matches found, retrying... ({attempt + 1}/{max_tries})")
+            except Exception as e:
+                if not driver.is_alive(): raise RuntimeError("Chrome session lost during ISIN search") from e
+                print(f"Error reading search results, retrying... {e}")
+            driver.wait_for(items_present(selectors["isin_items"]), "items", fallback=buffer)
+    if not match:
+        driver.switch_to_default()
+        print(f"Unresolved: {bond_name} not found in {corp_name} search results")
+        return None
+
+    pos, name, isin = match
+    row = listed[pos][0]
+    print(f"Found match: position {row}")
+    driver.click_button(f"#isinList_{row}_ISIN_ROW", settle=False)
+    driver.switch_to_default()
+    driver.wait_for(element_hidden(selectors["popup_frame"]), "hidden", fallback=buffer)
+
+    after = driver.driver.execute_script(INPUTS_SCRIPT)
+    selection = {k: v for k, v in after.items() if before.get(k) != v
+                 and k not in (selectors["from_date_selector"][1:], selectors["to_date_selector"][1:])}
+    return resolver.put(corp_name, bond_name, isin=isin, name=name, row=row, selection=selection)
+
+def get_bond(driver, corp_name, bond_name, from_date, to_date, buffer=None, resolver=None, prices=True):
+    # Returns {"DB": exercise rows, "EX": exercise-price rows}, both None if the bond could not be resolved;
+    # "EX" is also None when the price history could not be confirmed (the cached copy is kept)
+    # 'buffer' is the sleep after a wait times out; None uses the driver's (learned) buffer_time
+    print(f"Getting single ticker: {corp_name}")
+    driver.start() # reuse the running session, relaunch only if it died
+    driver.reset()
+
+    resolver = resolver or IsinResolver()
+
+    for restore in (True, False): # an indexed selection first; the popup search if it did not select this bond
+        driver.open(selectors["details_url"])
+
+        entry = resolve_isin(driver, resolver, corp_name, bond_name, buffer=buffer, restore=restore)
+        if entry is None: return {"DB": None, "EX": None}
+
+        # The price history is queried from this page with the resolved ISIN while the exercise grid loads,
+        # instead of opening prc_url and repeating the company search there
+        isin = entry.get("isin")
+        if prices and isin: start_price_query(driver, isin)
+        elif prices: print(f"No ISIN indexed for {bond_name}, skipping the exercise-price history")
+
+        rows = read_exercise_rows(driver, corp_name, from_date, to_date, buffer, expect_isin=isin if entry.get("restored") else None)
+        if rows is not None: break
+        print(f"Restored selection did not query {isin}, searching {bond_name} again")
+        resolver.forget_selection(corp_name, bond_name)
+    return {"DB": rows, "EX": read_prices(driver, corp_name, isin) if prices and isin else None}
+
+# Service calls that have answered with dated rows in this process, i.e. whose names are known to be right
+CONFIRMED_QUERIES = set()
+
+def get_company(driver, corp_name, bonds, to_date, buffer=None, resolver=None, prices=True):
+    # One {"DB", "EX"} result per (bond_name, from_date) in 'bonds': one popup search resolves every bond,
+    # then each ISIN is queried back to back from the same page. The screen stays the source of truth:
+    # an in-page answer is used when it has dated rows, or is complete and empty once the query has been
+    # confirmed; anything else is selected from the same popup list and queried on the screen
+    print(f"Getting company: {corp_name} ({len(bonds)} bonds)")
+    resolver = resolver or IsinResolver()
+    driver.start()
+    driver.reset()
+
+    driver.open(selectors["details_url"])
+
+    isins = resolve_company(driver, resolver, corp_name, [bond_name for bond_name, _ in bonds], buffer=buffer)
+    fields = QUERIES["exercise_history"]["fields"]
+    results = []
+    for (bond_name, from_date), isin in zip(bonds, isins):
+        if not isin:
+            results.append({"DB": None, "EX": None})
+            continue
+        window = {"isin": isin, "from_date": from_date, "to_date": to_date}
+        start_query(driver, "exercise", "exercise_history", **window)
+        if prices: start_price_query(driver, isin)
+        with TRACER.span("exercise_history"): raw, complete = collect_query(driver, "exercise", "exercise_history", **window)
+        price_rows = read_prices(driver, corp_name, isin) if prices else None
+        if complete and dated_rows(raw, fields): CONFIRMED_QUERIES.add("exercise_history")
+        if complete and (dated_rows(raw, fields) or (not raw and "exercise_history" in CONFIRMED_QUERIES)):
+            results.append({"DB": [exercise_record(corp_name, row, fields) for row in raw], "EX": price_rows})
+            continue
+        # failed, unrecognised, or empty before the query was confirmed: the screen decides
+        print(f"Exercise history of {isin} not confirmed in-page, querying {bond_name} on the screen")
+        capture = bool(getattr(driver, "capture_pattern", None))
+        rows = None
+        if select_listed(driver, resolver, corp_name, bond_name, buffer) == isin:
+            rows = read_exercise_rows(driver, corp_name, from_date, to_date, buffer, expect_isin=isin if capture else None)
+        if rows is None: # not selectable on this page: the single-bond path, prices already read
+            rows = get_bond(driver, corp_name, bond_name, from_date, to_date, buffer, resolver, prices=False)["DB"]
+        results.append({"DB": rows, "EX": price_rows})
+    return results
+
+def get_single_ticker(driver, corp_name, bond_name, from_date, to_date, buffer=None, resolver=None):
+    # Returns the exercise rows, or None if the bond could not be resolved
+    return get_bond(driver, corp_name, bond_name, from_date, to_date, buffer, resolver, prices=False)["DB"]
+
+def read_exercise_rows(driver, corp_name, from_date, to_date, buffer=None, expect_isin=None):
+    # Query the selected bond's exercise history for the date range and read the result.
+    # With 'expect_isin', None unless the captured query was sent for that ISIN (a stale restored selection)
+    driver.fill_input(selectors["from_date_selector"], from_date)
+
+    driver.fill_input(selectors["to_date_selector"], to_date)
+
+    capture = bool(getattr(driver, "capture_pattern", None))
+    mark = driver.capture_mark() if capture else 0
+    previous_key, previous_xhr = driver.table_key(selectors["grid_body"]), driver.xhr_state()
+    rendered = table_rendered(selectors["grid_body"], previous_key, previous_xhr)
+    driver.click_button(selectors["corp_search"], until=first_of(response_captured(mark), rendered) if capture else rendered,
+                        name="table")
+
+    if expect_isin and requested_isin(driver, mark) != expect_isin: return None
+
+    if capture:
+        rows = read_payload(driver, corp_name, mark)
+        if rows is not None: return rows
+        driver.wait_for(rendered, "table", fallback=buffer) # no complete payload seen: read the rendered grid
+
+    # Parse table rows into dicts using a mapper (indices based on current table layout)
+    def _row_mapper(values):
+        row_dict = {}
+        row_dict["title"] = corp_name
+        row_dict["date"] = values[5]
+        row_dict["exc_amount"] = to_number(values[6])
+        row_dict["exc_shares"] = to_number(values[8])
+        row_dict["exc_price"] = to_number(values[9])
+        row_dict["listing_date"] = values[10]
+        return row_dict
+
+    return read_grid(driver, _row_mapper)
+
+SERVICE_PAGE_SIZE = 500
+
+def start_query(driver, key, name, start_page=1, **values):
+    # Send a QUERIES service call from the loaded page in the background; collect it with collect_query
+    query = QUERIES[name]
+    params = query_params(query, start_page=start_page, end_page=start_page + SERVICE_PAGE_SIZE - 1, **values)
+    driver.start_request(key, SERVICE_PATH, build_request(query["action"], query["task"], params))
+
+def collect_query(driver, key, name, **values):
+    # (raw rows, complete) of a query started with start_query; later pages are requested in turn.
+    # 'complete' only means every page came back parsed: an empty list may still be a wrong service name
+    rows, start_page = [], 1
+    while True:
+        result = driver.request_result(key)
+        if not result or result.get("status") != 200: return rows, False
+        try: page = parse_response(result.get("body", ""))
+        except Exception as e:
+            print(f"Could not parse the {name} response: {e}")
+            return rows, False
+        rows.extend(page)
+        if len(page) < SERVICE_PAGE_SIZE: return rows, True
+        start_page += SERVICE_PAGE_SIZE
+        start_query(driver, key, name, start_page, **values)
+
+def start_price_query(driver, isin):
+    start_query(driver, "prices", "price_history", isin=isin)
+
+def dated_rows(raw_rows, fields) -> bool:
+    # True if an in-page answer has rows and every row carries a date under the expected field name.
+    # The service names are unverified, so an empty or unrecognised answer is not taken as "no rows".
+    return bool(raw_rows) and all(re.fullmatch(r"\d{4}-\d{2}-\d{2}", isodate(raw.get(fields["date"])) or "") for raw in raw_rows)
+
+@TRACER.traced("price_history")
+def read_prices(driver, corp_name, isin):
+    # Collect the exercise-price query started by start_price_query; None if it failed, came back empty
+    # or did not look like price rows, so the cached history is not overwritten
+    fields = QUERIES["price_history"]["fields"]
+    rows, complete = collect_query(driver, "prices", "price_history", isin=isin)
+    if not complete or not dated_rows(rows, fields):
+        print(f"Exercise-price history of {isin} not confirmed, keeping the cached copy")
+        return None
+    return [price_record(corp_name, raw, fields) for raw in rows]
+
+@TRACER.traced("sweep")
+def sweep_exercise_rows(driver, from_date, to_date):
+    # Raw exercise-history rows of every bond in the date range (no ISIN filter), None if incomplete
+    print(f"Sweeping exercise history: {from_date} ~ {to_date}")
+    driver.start()
+    driver.reset()
+    driver.open(selectors["details_url"])
+    start_query(driver, "sweep", "exercise_history", isin="", from_date=from_date, to_date=to_date)
+    rows, complete = collect_query(driver, "sweep", "exercise_history", isin="", from_date=from_date, to_date=to_date)
+    return rows if complete else None
+
+def requested_isin(driver, since):
+    # ISIN the page's exercise-history query was sent for, from the captured request; None if none was seen
+    action = QUERIES["exercise_history"]["action"]
+    for response in driver.captured(since):
+        try: found, _, params = parse_request(response["request"])
+        except Exception: continue
+        if found == action: return params.get(ISIN_PARAM)
+    return None
+
+@TRACER.traced("read_payload")
+def read_payload(driver, corp_name, since):
+    # Exercise rows parsed from the captured service response(s), None unless the payload is known to be whole:
+    # paging params present and the last page short, every row dated, and the count matching the page's "총 N 건"
+    query = QUERIES["exercise_history"]
+    raw_rows, complete = [], False
+    for response in driver.captured(since):
+        try: action, _, params = parse_request(response["request"])
+        except Exception: continue
+        if action != query["action"] or response["status"] != 200: continue
+        try: page = parse_response(response["body"])
+        except Exception: return None # unparsable payload: fall back to the DOM
+        raw_rows.extend(page)
+        try: requested = int(params["END_PAGE"]) - int(params["START_PAGE"]) + 1
+        except (KeyError, ValueError): return None # unknown paging: a full page may have more behind it
+        complete = len(page) < requested
+    if not complete or not dated_rows(raw_rows, query["fields"]): return None
+    total = driver.driver.execute_script(TOTAL_COUNT_SCRIPT)
+    if total is not None and len(raw_rows) != total:
+        print(f"Captured {len(raw_rows)} rows but the page reports {total}, reading the grid")
+        return None
+    print(f"Read {len(raw_rows)} rows from the captured response")
+    return [exercise_record(corp_name, raw, query["fields"]) for raw in raw_rows]
+
+# Total row count the page reports for the current query ("총 123 건"), None if not shown
+TOTAL_COUNT_SCRIPT = """
+var text = document.body ? document.body.innerText : '';
+var m = text.match(/총\\s*([0-9,]+)\\s*건/);
+return m ? parseInt(m[1].replace(/,/g, ''), 10) : null;
+"""
+
+@TRACER.traced("read_grid")
+def read_grid(driver, row_mapper):
+    # Read all result rows in one pass from the grid's data model; DOM paging is the fallback
+    total = driver.driver.execute_script(TOTAL_COUNT_SCRIPT)
+    values = driver.grid_values(selectors["grid_id"])
+    if values is not None and total is not None and len(values) == total:
+        print(f"Read {total} rows from the grid model")
+        return [row for row in (_map_row(row_mapper, v) for v in values) if row]
+    if values is not None:
+        print(f"Grid model holds {len(values)} of {total} rows, paging through the table")
+
+    all_rows_dicts = read_pages(driver, row_mapper)
+    if total is not None and len(all_rows_dicts) != total:
+        print(f"Warning: read {len(all_rows_dicts)} rows but the page reports {total}")
+    return all_rows_dicts
+
+def _map_row(row_mapper, values):
+    try: return row_mapper(values)
+    except Exception: return None # Skip if mapping failed
+
+def read_pages(driver, row_mapper):
+    # DOM paging: read 15 rows, click next, repeat until the page key stops changing.
+    # A page that cannot be read raises: a partial list would be merged as the window's whole history
+    all_rows_dicts = []
+    previous_page_key = None
+    page_num = 1
+    while True:
+        try:
+            with TRACER.span("page"): # one read + next-click cycle
+                data_dicts, rows = driver.table_to_dicts(selectors["grid_body"], row_mapper)
+
+                page_key = driver.get_page_key(rows) if rows else None
+                if previous_page_key is not None and page_key == previous_page_key: break # same page, stop
+
+                all_rows_dicts.extend(data_dicts)
+                previous_page_key = page_key
+                # Check if current page is full (15 rows) - if not, no next page
+                if len(rows) < 15: break
+                previous_key, previous_xhr = driver.table_key(selectors["grid_body"]), driver.xhr_state()
+                driver.click_button(selectors["next_page_btn"],
+                                    until=table_rendered(selectors["grid_body"], previous_key, previous_xhr), name="table")
+                page_num += 1
+        except Exception as e:
+            raise RuntimeError(f"could not read page {page_num} of the exercise grid: {e}") from e
+    return all_rows_dicts
@@ -0,0 +1,218 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from utilitylib.websquare import WebSquareClient
+from utilitylib.ratelimit import RateGovernor, BlockedError
+from utilitylib.tracing import TRACER
+from utilitylib.timing import AdaptiveTimers
+from records import fmtdate, to_number
+from resolver import IsinResolver
+
+SEIBRO_URL = "https://seibro.or.kr"
+DETAILS_REFERER = SEIBRO_URL + "/websquare/control.jsp?w2xPath=/IPORTAL/user/bond/BIP_CNTS03024V.xml&menuNo=416"
+
+# Service calls made by the BIP_CNTS03024V screen (ISIN popup and exercise-history grid)
+# and the BIP_CNTS03025V screen (exercise-price history).
+# UNVERIFIED: the action/task and field names below are assumptions that have not been checked against
+# live SEIBRO traffic (the mock server is built from these same names, so offline runs cannot confirm them).
+# Confirm them in the browser's network tab before relying on the HTTP backend or the in-page queries.
+QUERIES = {
+    "isin_search": {
+        "action": "bondIsinSrchList",
+        "task": "ksd.safe.bip.cmuc.process.BondIsinSrchPTask",
+        "params": {"MENU_NO": "416", "SECN_NM": "{corp_name}"},
+        "fields": {"isin": "ISIN", "name": "KOR_SECN_NM"},
+    },
+    "exercise_history": {
+        "action": "bondExerHistList",
+        "task": "ksd.safe.bip.cnts.bond.process.BondExerPTask",
+        "params": {
+            "MENU_NO": "416",
+            "ISIN": "{isin}",
+            "FROM_DT": "{from_date}",
+            "TO_DT": "{to_date}",
+            "START_PAGE": "{start_page}",
+            "END_PAGE": "{end_page}",
+        },
+        "fields": {
+            "date": "EXER_REQ_DT",
+            "exc_amount": "EXER_AMT",
+            "exc_shares": "EXER_SHRS",
+            "exc_price": "EXER_PRC",
+            "listing_date": "LIST_DT",
+            "isin": "ISIN",         # bond identity, needed to attribute market-wide (sweep) rows
+            "name": "KOR_SECN_NM",
+        },
+    },
+    "price_history": {
+        "action": "bondExerPrcChgList",
+        "task": "ksd.safe.bip.cnts.bond.process.BondExerPrcPTask",
+        "params": {
+            "MENU_NO": "417",
+            "ISIN": "{isin}",
+            "START_PAGE": "{start_page}",
+            "END_PAGE": "{end_page}",
+        },
+        "fields": {
+            "date": "CHG_DT",
+            "prv_prc": "BF_EXER_PRC",
+            "cur_prc": "AF_EXER_PRC",
+        },
+    },
+}
+
+def query_params(query: dict, **values) -> dict:
+    # Fill a QUERIES entry's parameter template, e.g. "{isin}" -> the bond's ISIN
+    return {key: str(value).format(**values) for key, value in query["params"].items()}
+
+def exercise_record(corp_name: str, raw: dict, fields: dict = QUERIES["exercise_history"]["fields"]) -> dict:
+    # One exercise-history service row -> DB record (same shape as the grid rows)
+    return {
+        "title": corp_name,
+        "date": fmtdate(raw.get(fields["date"])),
+        "exc_amount": to_number(raw.get(fields["exc_amount"])),
+        "exc_shares": to_number(raw.get(fields["exc_shares"])),
+        "exc_price": to_number(raw.get(fields["exc_price"])),
+        "listing_date": fmtdate(raw.get(fields["listing_date"])),
+    }
+
+def price_record(corp_name: str, raw: dict, fields: dict = QUERIES["price_history"]["fields"]) -> dict:
+    # One exercise-price service row -> EX record
+    return {
+        "title": corp_name,
+        "date": fmtdate(raw.get(fields["date"])),
+        "prv_prc": to_number(raw.get(fields["prv_prc"])),
+        "cur_prc": to_number(raw.get(fields["cur_prc"])),
+    }
+
+class HttpScraper:
+    '''
+    SEIBRO backend that issues the screen's service calls directly instead of driving Chrome.
+    get_single_ticker / get_bond return the same row dictionaries as their seibro_browser counterparts.
+    '''
+    def __init__(self, base_url: str = SEIBRO_URL, queries: dict = QUERIES, page_size: int = 500, timeout: float = 10,
+                 governor: RateGovernor = None, adaptive: AdaptiveTimers = None, cancel=None):
+        self.queries = queries
+        self.page_size = page_size
+        self.client = WebSquareClient(base_url, referer=DETAILS_REFERER if base_url == SEIBRO_URL else base_url, timeout=timeout,
+                                      governor=governor, timers=adaptive, cancel=cancel)
+        self.governor = self.client.governor
+        self.adaptive = adaptive
+        self.executor = None # second lane for the exercise-price query, created on first use
+
+    def _call(self, name: str, **values):
+        query = self.queries[name]
+        return self.client.call(query["action"], query["task"], query_params(query, **values))
+
+    @TRACER.traced("isin_search")
+    def search_isin(self, corp_name: str):
+        '''
+        Return the popup search result for 'corp_name' as [(bond name, ISIN)].
+        '''
+        fields = self.queries["isin_search"]["fields"]
+        rows = self._call("isin_search", corp_name=corp_name)
+        return [(row.get(fields["name"], ""), row.get(fields["isin"], "")) for row in rows]
+
+    def find_isin(self, corp_name: str, bond_name: str, resolver: IsinResolver = None):
+        '''
+        Return the ISIN of 'bond_name', None if unresolved. An indexed ISIN skips the search call.
+        '''
+        return self.resolve_company(corp_name, [bond_name], resolver or IsinResolver())[0]
+
+    def resolve_company(self, corp_name: str, bond_names: list, resolver: IsinResolver):
+        '''
+        Return the ISINs of several bonds of one company (None where unresolved) from at most one search call.
+        '''
+        candidates, isins = None, []
+        for bond_name in bond_names:
+            entry = resolver.get(corp_name, bond_name)
+            if entry and entry.get("isin"):
+                isins.append(entry["isin"])
+                continue
+            if candidates is None: candidates = self.search_isin(corp_name)
+            match = resolver.match(corp_name, bond_name, candidates)
+            if not match:
+                isins.append(None)
+                continue
+            pos, name, isin = match
+            resolver.put(corp_name, bond_name, isin=isin, name=name, row=pos)
+            isins.append(isin)
+        return isins
+
+    def get_exercise_rows(self, corp_name: str, isin: str, from_date: str, to_date: str):
+        '''
+        Return every exercise-history row of 'isin', requesting page_size rows per call.
+        '''
+        fields = self.queries["exercise_history"]["fields"]
+        return [exercise_record(corp_name, raw, fields)
+                for raw in self._paged("exercise_history", isin=isin, from_date=from_date, to_date=to_date)]
+
+    def _paged(self, name: str, **values):
+        # Every row of a paged service query, page_size rows per call
+        rows, start = [], 1
+        while True:
+            page = self._call(name, start_page=start, end_page=start + self.page_size - 1, **values)
+            rows.extend(page)
+            if len(page) < self.page_size: return rows # last page
+            start += self.page_size
+
+    @TRACER.traced("sweep")
+    def sweep_exercise_rows(self, from_date: str, to_date: str):
+        '''
+        Return the raw exercise-history rows of every bond in the date range (the query without an ISIN).
+        '''
+        print(f"Sweeping exercise history (http): {from_date} ~ {to_date}")
+        return self._paged("exercise_history", isin="", from_date=from_date, to_date=to_date)
+
+    @TRACER.traced("price_history")
+    def get_price_rows(self, corp_name: str, isin: str):
+        '''
+        Return the exercise-price change history of 'isin' as EX records.
+        '''
+        fields = self.queries["price_history"]["fields"]
+        return [price_record(corp_name, raw, fields) for raw in self._paged("price_history", isin=isin)]
+
+    def get_bond(self, corp_name, bond_name, from_date, to_date, resolver: IsinResolver = None, prices: bool = True):
+        '''
+        Return {"DB": exercise rows, "EX": exercise-price rows} for one bond, both None if unresolved.
+        The price query runs alongside the exercise query, on the ISIN resolved once.
+        '''
+        print(f"Getting single ticker (http): {corp_name}")
+        isin = self.find_isin(corp_name, bond_name, resolver)
+        if not isin:
+            print(f"Unresolved: no ISIN found for {bond_name}")
+            return {"DB": None, "EX": None}
+        if not prices: return {"DB": self.get_exercise_rows(corp_name, isin, from_date, to_date), "EX": None} # None: keep the cache
+        if self.executor is None: self.executor = ThreadPoolExecutor(max_workers=1)
+        pending = self.executor.submit(TRACER.bind(self.get_price_rows), corp_name, isin)
+        rows = self.get_exercise_rows(corp_name, isin, from_date, to_date)
+        try: price_rows = pending.result()
+        except BlockedError: raise
+        except Exception as e: # the exercise rows are still good; None keeps the cached price history
+            print(f"Exercise-price history of {isin} failed, keeping the cached copy: {e}")
+            price_rows = None
+        return {"DB": rows, "EX": price_rows}
+
+    def get_company(self, corp_name, bonds, to_date, resolver: IsinResolver = None, prices: bool = True):
+        '''
+        Return one {"DB", "EX"} result per (bond_name, from_date) in 'bonds', resolving them with one search call.
+        '''
+        resolver = resolver or IsinResolver()
+        isins = self.resolve_company(corp_name, [bond_name for bond_name, _ in bonds], resolver)
+        return [self.get_bond(corp_name, bond_name, from_date, to_date, resolver, prices) if isin else {"DB": None, "EX": None}
+                for (bond_name, from_date), isin in zip(bonds, isins)]
+
+    def get_single_ticker(self, corp_name, bond_name, from_date, to_date, resolver: IsinResolver = None):
+        # Returns the exercise rows, or None if the bond could not be resolved
+        return self.get_bond(corp_name, bond_name, from_date, to_date, resolver, prices=False)["DB"]
+
+    def start(self): return self
+
+    def is_alive(self): return True
+
+    def restart(self): pass
+
+    def cleanup(self):
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.client.close()
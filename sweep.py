@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from records import fmtkey
+from seibro_http import QUERIES
+
+def date_chunks(from_date: str, to_date: str, days: int = 31) -> list:
+    # [from_date, to_date] (YYYYMMDD) as consecutive windows of at most 'days' days
+    start, end = datetime.strptime(from_date, "%Y%m%d"), datetime.strptime(to_date, "%Y%m%d")
+    chunks = []
+    while start <= end:
+        stop = min(start + timedelta(days=days - 1), end)
+        chunks.append((start.strftime("%Y%m%d"), stop.strftime("%Y%m%d")))
+        start = stop + timedelta(days=1)
+    return chunks
+
+def attribute(raw_rows: list, items: list, resolver, fields: dict = QUERIES["exercise_history"]["fields"]):
+    '''
+    Partition market-wide exercise rows among the LIST entries 'items' [(index, [bond_name, company])].
+    A row belongs to the entry with its ISIN in the resolver index, else to the one entry with the same
+    fmtkey bond key; ISINs learned from name matches are indexed. Rows of bonds not on the list are dropped.
+    Only an entry with an indexed ISIN, in a response that identifies rows by ISIN, is confirmed to have no
+    exercises when no row is found for it; every other entry without rows needs a per-bond query, and so does
+    every entry when the sweep returned nothing at all.
+    Returns ({index: [raw rows]}, {indexes that need a per-bond query}).
+    '''
+    if not raw_rows: return {}, {index for index, _ in items}
+    entries, by_isin, by_key, indexed = dict(items), {}, {}, set()
+    for index, (bond_name, company) in items:
+        entry = resolver.get(company, bond_name) or {}
+        if entry.get("isin"):
+            by_isin[entry["isin"]] = index
+            indexed.add(index)
+        by_key.setdefault(fmtkey(bond_name), []).append(index)
+
+    found, fallback = {}, set()
+    for raw in raw_rows:
+        isin, name = raw.get(fields["isin"]), raw.get(fields["name"])
+        if not isin and not name: # the response does not identify bonds: nothing can be attributed
+            print("Sweep rows carry no bond identity, querying every bond separately")
+            return {}, {index for index, _ in items}
+        if isin in by_isin:
+            found.setdefault(by_isin[isin], []).append(raw)
+            continue
+        # Entries with an indexed ISIN only take rows by ISIN; a name match there is another bond with the same key
+        matches = [index for index in by_key.get(fmtkey(name), []) if index not in indexed] if name else []
+        if len(matches) == 1:
+            index = matches[0]
+            found.setdefault(index, []).append(raw)
+            bond_name, company = entries[index]
+            if isin:
+                resolver.put(company, bond_name, isin=isin, name=name)
+                by_isin[isin] = index
+                indexed.add(index)
+        elif matches:
+            fallback.update(matches) # several list entries share the key: ask each bond directly
+    by_row_isin = any(raw.get(fields["isin"]) for raw in raw_rows)
+    for index, _ in items: # no row is not proof of no exercises unless the bond could have been matched by ISIN
+        if index not in found and not (by_row_isin and index in indexed): fallback.add(index)
+    for index in fallback: found.pop(index, None)
+    return found, fallback
@@ -1,4 +1,24 @@
-from .driver import ChromeDriver, Finder, TableScraper
-# from .gcshandler import GCS
+import importlib
 
-__all__ = ['ChromeDriver', 'Finder', 'TableScraper']
+# Submodules are imported on first use, so 'import utilitylib' stays cheap
+# (selenium is only loaded for the browser classes, and is optional with the HTTP backend).
+_LAZY = {
+    'ChromeDriver': '.driver', 'Finder': '.driver', 'TableScraper': '.driver',
+    'WebSquareClient': '.websquare', 'ServiceError': '.websquare',
+    'RateGovernor': '.ratelimit', 'DEFAULT_GOVERNOR': '.ratelimit', 'BlockedError': '.ratelimit', 'ScrapeCancelled': '.ratelimit',
+    'Tracer': '.tracing', 'TRACER': '.tracing',
+    'NetworkFilter': '.netfilter',
+    'AdaptiveTimers': '.timing',
+    'GCS': '.gcshandler', 'BatchWriter': '.gcshandler', 'LocalBackend': '.gcshandler',
+}
+
+def __getattr__(name):
+    if name not in _LAZY: raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try: value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    except ImportError:
+        if _LAZY[name] != '.driver': raise
+        value = None # selenium is optional with the HTTP backend
+    globals()[name] = value
+    return value
+
+__all__ = ['ChromeDriver', 'Finder', 'TableScraper', 'WebSquareClient', 'ServiceError', 'RateGovernor', 'DEFAULT_GOVERNOR', 'BlockedError', 'ScrapeCancelled', 'Tracer', 'TRACER', 'NetworkFilter', 'AdaptiveTimers', 'GCS', 'BatchWriter', 'LocalBackend']
@@ -1,7 +1,9 @@
 import os
+import re
 import sys
 import json
 import time
+import threading
 
 from typing import Callable, List, Optional, Tuple, Dict, Any
 from selenium import webdriver
@@ -9,32 +11,410 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
+
+from .ratelimit import DEFAULT_GOVERNOR, RateGovernor, BlockedError, ScrapeCancelled
+from .tracing import TRACER
+from .netfilter import NetworkFilter, page_bytes
+from .timing import AdaptiveTimers
+
+DEFAULT_TIMERS = {
+    "buffer_time": 0.3, # fallback sleep when a wait condition times out
+    "load_time": 10,    # page load and element lookup timeout
+    "poll_time": 0.05,  # polling interval of condition waits
+    "wait_timeouts": {  # per-condition timeouts
+        "frame": 10,
+        "items": 10,
+        "table": 10,
+        "hidden": 5,
+        "value": 2,
+        "request": 10,
+    },
+}
+# Waits that end with a server answer (grid query, popup search); the others only wait for the DOM.
+# In-page service calls ("request") are reported by request_result, which sees their status and body
+NETWORK_WAITS = ("table", "items")
+
+# Counts pending/finished XHRs so a wait can tell when a grid query has come back
+XHR_PROBE_SCRIPT = """
+if (!window.__kindXhr) {
+  var state = {pending: 0, done: 0, pattern: null, seq: 0, captured: []};
+  window.__kindXhr = state;
+  var open = XMLHttpRequest.prototype.open;
+  XMLHttpRequest.prototype.open = function(method, url) {
+    this.__kindUrl = String(url);
+    return open.apply(this, arguments);
+  };
+  var send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function(body) {
+    var xhr = this;
+    if (xhr.__kindIgnore) return send.apply(this, arguments); // the scraper's own requests
+    state.pending++;
+    this.addEventListener('loadend', function(){
+      if (state.pattern && new RegExp(state.pattern).test(xhr.__kindUrl || '')) {
+        var text = '';
+        try { text = xhr.responseType === '' || xhr.responseType === 'text' ? xhr.responseText : ''; } catch (e) {}
+        state.seq++;
+        state.captured.push({seq: state.seq, url: xhr.__kindUrl, request: typeof body === 'string' ? body : '', status: xhr.status, body: text});
+        if (state.captured.length > 20) state.captured.shift();
+      }
+      state.pending--; state.done++;
+    });
+    return send.apply(this, arguments);
+  };
+}
+window.__kindXhr.pattern = arguments[0] || null;
+"""
+
+# Starts a POST from the page (same session, cookies and origin) without blocking; the result lands in
+# window.__kindRequests[key] as {status, body}. Not counted by the XHR probe, so grid waits are unaffected.
+REQUEST_SCRIPT = """
+var key = arguments[0], url = arguments[1], body = arguments[2];
+window.__kindRequests = window.__kindRequests || {};
+window.__kindRequests[key] = null;
+var xhr = new XMLHttpRequest();
+xhr.__kindIgnore = true;
+xhr.open('POST', url);
+xhr.setRequestHeader('Content-Type', 'application/xml; charset=UTF-8');
+xhr.onloadend = function() { window.__kindRequests[key] = {status: xhr.status, body: xhr.responseText}; };
+xhr.send(body);
+"""
+
+# Captured responses newer than 'since': [{seq, url, request, status, body}, ...]
+CAPTURED_SCRIPT = """
+var s = window.__kindXhr, since = arguments[0];
+if (!s) return null;
+return s.captured.filter(function(r) { return r.seq > since; });
+"""
+
+TABLE_KEY_SCRIPT = """
+var tbody = document.querySelector(arguments[0]);
+if (!tbody) return null;
+var rows = tbody.getElementsByTagName('tr');
+for (var i = 0; i < rows.length; i++) {
+  var cells = rows[i].getElementsByTagName('td');
+  if (!cells.length || !cells[0].getClientRects().length) continue;
+  var texts = [];
+  for (var j = 0; j < cells.length; j++) texts.push(cells[j].textContent.trim());
+  return texts.join('|');
+}
+return '';
+"""
+
+# Reads every row's cell texts of a tbody in one call; rows whose first cell is hidden are skipped when display_only
+TABLE_VALUES_SCRIPT = """
+var tbody = document.querySelector(arguments[0]);
+if (!tbody) return null;
+var displayOnly = arguments[1];
+var rows = tbody.getElementsByTagName('tr');
+var result = [];
+for (var i = 0; i < rows.length; i++) {
+  var cells = rows[i].getElementsByTagName('td');
+  if (!cells.length) continue;
+  if (displayOnly) {
+    var first = cells[0];
+    if (!first.getClientRects().length || window.getComputedStyle(first).visibility === 'hidden') continue;
+  }
+  var texts = [];
+  for (var j = 0; j < cells.length; j++) texts.push(cells[j].textContent.trim());
+  result.push(texts);
+}
+return result;
+"""
+
+# Reads a WebSquare gridView's backing data as displayed, bypassing the rendered (paged) rows
+GRID_MODEL_SCRIPT = """
+var id = arguments[0];
+var grid = null;
+try { if (window.$p && $p.getComponentById) grid = $p.getComponentById(id); } catch (e) {}
+try { if (!grid && window.WebSquare && WebSquare.util) grid = WebSquare.util.getComponentById(id); } catch (e) {}
+if (!grid) grid = window[id];
+if (!grid || typeof grid.getTotalRow !== 'function' || typeof grid.getCellDisplayData !== 'function') return null;
+var cols = typeof grid.getColumnCount === 'function' ? grid.getColumnCount() : 0;
+if (!cols) return null;
+var total = grid.getTotalRow();
+var rows = [];
+for (var r = 0; r < total; r++) {
+  var row = [];
+  for (var c = 0; c < cols; c++) {
+    var v = grid.getCellDisplayData(r, c);
+    row.push(v === null || v === undefined ? '' : String(v).trim());
+  }
+  rows.push(row);
+}
+return rows;
+"""
+
+def frame_loaded(frame_selector: str):
+    '''
+    Condition: iframe with 'frame_selector' selector exists and its document finished loading.
+    '''
+    def _condition(driver):
+        return driver.execute_script(
+            """
+            var frame = document.querySelector(arguments[0]);
+            if (!frame) return false;
+            try { var doc = frame.contentDocument; } catch (e) { return false; }
+            return !!doc && doc.readyState === 'complete' && !!doc.body && doc.body.children.length > 0;
+            """,
+            frame_selector,
+        )
+    return _condition
+
+def items_present(selector: str):
+    '''
+    Condition: at least one element matches 'selector' selector.
+    '''
+    def _condition(driver):
+        return driver.execute_script("return document.querySelectorAll(arguments[0]).length;", selector) > 0
+    return _condition
+
+def element_hidden(selector: str):
+    '''
+    Condition: element with 'selector' selector is gone or not displayed.
+    '''
+    def _condition(driver):
+        return driver.execute_script(
+            """
+            var el = document.querySelector(arguments[0]);
+            return !el || !el.getClientRects().length;
+            """,
+            selector,
+        )
+    return _condition
+
+def value_equals(element, value: str):
+    '''
+    Condition: input 'element' holds 'value' value, ignoring the separators a masked input adds
+    (WebSquare's date inputs show "20240101" as "2024-01-01").
+    '''
+    wanted = re.sub(r"[\s\-./:]", "", str(value))
+    def _condition(driver):
+        return re.sub(r"[\s\-./:]", "", element.get_attribute("value") or "") == wanted
+    return _condition
+
+def table_rendered(tbody_selector: str, previous_key, previous_xhr):
+    '''
+    Condition: table body was re-rendered since 'previous_key'/'previous_xhr' were taken.
+    The first visible row changed, or a request finished and nothing is pending.
+    '''
+    def _condition(driver):
+        key = driver.execute_script(TABLE_KEY_SCRIPT, tbody_selector)
+        if key and key != previous_key: return True
+        xhr = driver.execute_script("var s = window.__kindXhr; return s ? [s.pending, s.done] : null;")
+        if xhr is None or previous_xhr is None: return False
+        return xhr[0] == 0 and xhr[1] > previous_xhr[1]
+    return _condition
+
+def request_done(key: str):
+    '''
+    Condition: the request started with ChromeDriver.start_request('key') has finished.
+    '''
+    def _condition(driver):
+        return driver.execute_script("var r = window.__kindRequests; return !!(r && r[arguments[0]]);", key)
+    return _condition
+
+def response_captured(previous_seq: int):
+    '''
+    Condition: a captured response newer than 'previous_seq' arrived and no request is pending.
+    '''
+    def _condition(driver):
+        state = driver.execute_script("var s = window.__kindXhr; return s ? [s.pending, s.seq] : null;")
+        return bool(state) and state[0] == 0 and state[1] > previous_seq
+    return _condition
+
+def first_of(*conditions):
+    '''
+    Condition: any of 'conditions' holds.
+    '''
+    def _condition(driver):
+        for condition in conditions:
+            if condition(driver): return True
+        return False
+    return _condition
+
+PAGE_TEXT_SCRIPT = "return document.title + '\\n' + (document.body ? document.body.innerText.slice(0, 2000) : '');"
 
 class ChromeDriver:
     def __init__(self, headless: bool = False, timers: dict = {
         "buffer_time": 0.3,
         "load_time": 10
-    }):
+    }, governor: RateGovernor = None, profile_dir: str = "/tmp/chrome", debug_port: int = 9222,
+                 network_filter: NetworkFilter = None, adaptive: AdaptiveTimers = None):
         self.headless = headless
+        self.network_filter = NetworkFilter() if network_filter is None else network_filter # False: load everything
+        self.capture_pattern = None # regex of XHR URLs whose responses are captured (TableScraper capture mode)
+        self.governor = governor or DEFAULT_GOVERNOR # shared rate budget for every request to the site
+        self.profile_dir = profile_dir # parallel instances need their own profile dir and port
+        self.debug_port = debug_port
+        self.cancel = threading.Event() # set from another thread to stop inside a company
         self.driver = None
         self.wait = None
-        self.timers = timers
+        self.timers = {**DEFAULT_TIMERS, **timers}
+        self.timers["wait_timeouts"] = {**DEFAULT_TIMERS["wait_timeouts"], **timers.get("wait_timeouts", {})}
+        self.adaptive = adaptive # learns the timeouts and buffer from observed latency; None: the fixed timers
+        self.page_load_timeout = None
 
+    @TRACER.traced("setup")
     def setup(self): 
+        if self.driver: self.cleanup() # never leave a previous Chrome instance running
         self.driver, self.wait = self._setup_driver(headless=self.headless)
+        self.page_load_timeout = self.timers["load_time"] # what _setup_driver applied
+        if self.network_filter: self.network_filter.apply(self.driver)
     
+    @TRACER.traced("open")
     def open(self, url: str):
         '''
         Open 'url' url.
         '''
+        self.check_cancel()
         try:
-            self.driver.get(url)
+            for _ in range(3): # a blocked load is retried after the governor's cooldown
+                TRACER.add("rate_wait", self.governor.acquire("open", self.cancel))
+                self.load(url)
+                if self.governor.report(200, self.page_text()): break
+            else: raise BlockedError(f"{url} is still blocked")
+            self.record_page_bytes()
+            self.install_xhr_probe()
             return True
+        except (BlockedError, ScrapeCancelled): raise
         except: return False
 
+    def load(self, url: str):
+        # driver.get under the learned page load timeout, recording how long the load took
+        timeout = self.timeout("load")
+        if timeout != self.page_load_timeout:
+            self.driver.set_page_load_timeout(timeout)
+            self.page_load_timeout = timeout
+        start = time.perf_counter()
+        try: self.driver.get(url)
+        except TimeoutException:
+            self.observe("load", timeout, timed_out=True)
+            raise
+        self.observe("load", time.perf_counter() - start)
+
+    def timeout(self, name: str) -> float:
+        '''
+        Timeout of wait 'name' ("load": page loads): learned if adaptive, else timers["wait_timeouts"] / load_time.
+        '''
+        default = self.timers["wait_timeouts"].get(name, self.timers["load_time"])
+        return self.adaptive.timeout(name, default) if self.adaptive else default
+
+    def buffer_time(self) -> float:
+        '''
+        Settle/fallback sleep: learned if adaptive, else timers["buffer_time"].
+        '''
+        return self.adaptive.buffer(self.timers["buffer_time"]) if self.adaptive else self.timers["buffer_time"]
+
+    def observe(self, name: str, seconds: float, timed_out: bool = False):
+        if self.adaptive and name: self.adaptive.observe(name, seconds, timed_out)
+
+    def check_cancel(self):
+        '''
+        Raise ScrapeCancelled if the run was stopped.
+        '''
+        if self.cancel.is_set(): raise ScrapeCancelled()
+
+    def page_text(self):
+        '''
+        Return the page title and the start of its visible text, used for block detection.
+        '''
+        try: return self.driver.execute_script(PAGE_TEXT_SCRIPT) or ""
+        except: return ""
+
+    def record_page_bytes(self):
+        '''
+        Record the bytes and resources the page load transferred ('page_bytes', 'page_resources', 'page_cached').
+        '''
+        loaded = page_bytes(self.driver)
+        if not loaded: return
+        for name, value in zip(("page_bytes", "page_resources", "page_cached"), loaded): TRACER.metric(name, value)
+
+    def install_xhr_probe(self):
+        '''
+        Track XHR activity of the current page, used by 'table_rendered' waits.
+        With 'capture_pattern' set, response bodies of matching request URLs are kept as well.
+        '''
+        try:
+            self.driver.execute_script(XHR_PROBE_SCRIPT, self.capture_pattern)
+            return True
+        except: return False
+
+    def start_request(self, key: str, url: str, body: str):
+        '''
+        Send a POST from the current page in the background, under the request budget.
+        Collect it with request_result('key').
+        '''
+        self.check_cancel()
+        TRACER.add("rate_wait", self.governor.acquire("request", self.cancel))
+        self.driver.execute_script(REQUEST_SCRIPT, key, url, body)
+
+    def request_result(self, key: str, timeout: float = None):
+        '''
+        Wait for the request started as 'key' and return {"status", "body"}, or None if it did not finish.
+        Each request is reported to the governor once, here: its answer, or a failure if it never came.
+        '''
+        if not self.wait_for(request_done(key), "request", timeout=timeout, fallback=0):
+            self.governor.failure() # no answer: back off the request rate
+            return None
+        result = self.driver.execute_script("return window.__kindRequests[arguments[0]];", key)
+        if result and not self.governor.report(result.get("status", 200), result.get("body", "")): return None
+        return result
+
+    def xhr_state(self):
+        '''
+        Return [pending, done] XHR counts of the current page, None if the probe is missing.
+        '''
+        try: return self.driver.execute_script("var s = window.__kindXhr; return s ? [s.pending, s.done] : null;")
+        except: return None
+
+    def table_key(self, tbody_selector: str):
+        '''
+        Return the first visible row's cell texts of 'tbody_selector' joined by '|'.
+        '''
+        try: return self.driver.execute_script(TABLE_KEY_SCRIPT, tbody_selector)
+        except: return None
+
+    @TRACER.traced("wait")
+    def wait_for(self, condition: Callable, name: str = "", timeout: float = None, fallback: float = None, network: bool = None):
+        '''
+        Wait until 'condition' returns a truthy value.
+        Timeout defaults to timeout(name); sleeps 'fallback' seconds (default: buffer_time()) if it expires.
+        The wait's duration is recorded for the adaptive timers; one already satisfied on the first check counts
+        as one poll interval. Only 'network' waits (default: name in NETWORK_WAITS)
+        move the governor's rate: a slow DOM reaction says nothing about the server.
+        '''
+        if timeout is None: timeout = self.timeout(name)
+        if network is None: network = name in NETWORK_WAITS
+        polls = 0
+        def _condition(driver): # checked on every poll so a stop takes effect mid-wait
+            nonlocal polls
+            polls += 1
+            self.check_cancel()
+            return condition(driver)
+        start = time.perf_counter()
+        try:
+            waiter = WebDriverWait(self.driver, timeout, poll_frequency=self.timers["poll_time"])
+            result = waiter.until(_condition)
+            self.observe(name, time.perf_counter() - start if polls > 1 else self.timers["poll_time"])
+            if network: self.governor.success()
+            return result
+        except Exception:
+            print(f"Wait '{name or 'condition'}' timed out after {timeout}s")
+            self.observe(name, timeout, timed_out=True)
+            if network:
+                if not self.governor.report(200, self.page_text()): return False # block page: governor pauses
+                self.governor.failure() # slow answer: back off the request rate
+            TRACER.sleep(self.buffer_time() if fallback is None else fallback)
+            return False
+
     def cleanup(self): 
-        if self.driver: self.driver.quit()
+        if self.driver:
+            try: self.driver.quit()
+            except: pass
+        self.driver, self.wait = None, None
 
+    @TRACER.traced("switch_to_frame")
     def switch_to_frame(self, frame_selector: str):
         '''
         Switch to frame with 'frame_selector' selector.
@@ -54,20 +434,28 @@ class ChromeDriver:
             return True
         except: return False
 
-    def click_button(self, selector: str, frame: str=""):
+    @TRACER.traced("click_button")
+    def click_button(self, selector: str, frame: str="", until: Callable=None, name: str="", settle: bool=True):
         '''
         Click a button with 'selector' selector.
+        Waits for 'until' condition (evaluated inside 'frame') if given, otherwise sleeps buffer_time when 'settle'.
         '''
+        self.check_cancel()
         try:
             if frame: self.switch_to_frame(frame)
             
             button = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+            TRACER.add("rate_wait", self.governor.acquire("click", self.cancel))
             self.driver.execute_script("arguments[0].click();", button)
             print(f"{selector} button clicked")
-            time.sleep(self.timers["buffer_time"])
+            if until: self.wait_for(until, name)
+            elif settle: TRACER.sleep(self.buffer_time())
 
             if frame: self.switch_to_default()
             return True
+        except ScrapeCancelled:
+            if frame: self.switch_to_default()
+            raise
         except:
             if frame: self.switch_to_default()
             return False
@@ -88,6 +476,7 @@ class ChromeDriver:
             for partial_xpath in xpath_patterns:
                 try:
                     element = self.driver.find_element(By.XPATH, partial_xpath)
+                    TRACER.add("rate_wait", self.governor.acquire("click", self.cancel))
                     self.driver.execute_script("arguments[0].click();", element)
                     print(f"{button_text} button clicked")
 
@@ -99,23 +488,27 @@ class ChromeDriver:
             if frame: self.switch_to_default()
             return False
 
+    @TRACER.traced("fill_input")
     def fill_input(self, selector: str, value: str, frame: str=""):
         '''
         Fill 'value' value in input box with 'selector' selector.
         '''
+        self.check_cancel()
         try:
             if frame: self.switch_to_frame(frame)        
 
             element = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
             self.driver.execute_script("arguments[0].click();", element)
-            time.sleep(self.timers["buffer_time"])
 
             element.clear()
             element.send_keys(value)
-            time.sleep(self.timers["buffer_time"])
+            self.wait_for(value_equals(element, value), "value")
 
             if frame: self.switch_to_default()
             return True
+        except ScrapeCancelled:
+            if frame: self.switch_to_default()
+            raise
         except: 
             if frame: self.switch_to_default()
             return False
@@ -185,10 +578,10 @@ class ChromeDriver:
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--remote-debugging-port=9222")
-        chrome_options.add_argument("--user-data-dir=/tmp/chrome-user-data")
-        chrome_options.add_argument("--data-path=/tmp/chrome-data")
-        chrome_options.add_argument("--disk-cache-dir=/tmp/chrome-cache")
+        chrome_options.add_argument(f"--remote-debugging-port={self.debug_port}")
+        chrome_options.add_argument(f"--user-data-dir={self.profile_dir}-user-data")
+        chrome_options.add_argument(f"--data-path={self.profile_dir}-data")
+        chrome_options.add_argument(f"--disk-cache-dir={self.profile_dir}-cache")
         chrome_options.add_argument("--remote-allow-origins=*")
         chrome_options.add_argument("--disable-software-rasterizer")
         chrome_options.add_argument("--no-first-run")
@@ -198,7 +591,6 @@ class ChromeDriver:
         chrome_options.add_argument("--disable-features=VizDisplayCompositor")
         chrome_options.add_argument("--disable-extensions")
         chrome_options.add_argument("--disable-plugins")
-        chrome_options.add_argument("--disable-images")
         chrome_options.add_argument("--disable-default-apps")
         chrome_options.add_argument("--disable-sync")
         chrome_options.add_argument("--disable-translate")
@@ -218,6 +610,8 @@ class ChromeDriver:
         chrome_options.add_argument("--silent")
         chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
         chrome_options.add_experimental_option('useAutomationExtension', False)
+        if self.network_filter and self.network_filter.prefs():
+            chrome_options.add_experimental_option('prefs', self.network_filter.prefs())
         
         chrome_options.add_argument("--window-size=1600,1000")
 
@@ -273,8 +667,66 @@ class TableScraper(ChromeDriver):
     def __init__(self, headless: bool = False, timers: dict = {
         "buffer_time": 0.3,
         "load_time": 10
-    }):
-        super().__init__(headless=headless, timers=timers)
+    }, governor: RateGovernor = None, profile_dir: str = "/tmp/chrome", debug_port: int = 9222,
+                 network_filter: NetworkFilter = None, capture: str = None, adaptive: AdaptiveTimers = None):
+        super().__init__(headless=headless, timers=timers, governor=governor, profile_dir=profile_dir, debug_port=debug_port,
+                         network_filter=network_filter, adaptive=adaptive)
+        self.restarts = 0
+        self.capture_pattern = capture # capture mode: keep XHR responses whose URL matches this regex
+
+    def capture_mark(self) -> int:
+        '''
+        Sequence number of the latest captured response; pass it to captured()/response_captured().
+        '''
+        try: return self.driver.execute_script("var s = window.__kindXhr; return s ? s.seq : 0;") or 0
+        except: return 0
+
+    def captured(self, since: int = 0) -> list:
+        '''
+        Responses captured after 'since' as [{"seq", "url", "request", "status", "body"}], oldest first.
+        Empty when capture mode is off or nothing matched.
+        '''
+        if not self.capture_pattern: return []
+        try: return self.driver.execute_script(CAPTURED_SCRIPT, since) or []
+        except: return []
+
+    def start(self):
+        '''
+        Start the browser session once. Later calls reuse it while it is healthy.
+        '''
+        if not self.is_alive(): self.restart()
+        return self.driver
+
+    def is_alive(self):
+        '''
+        Health check: the session responds and still has an open window.
+        '''
+        if not self.driver: return False
+        try: return len(self.driver.window_handles) > 0
+        except: return False
+
+    def restart(self):
+        '''
+        Quit the current session (if any) and launch a fresh one.
+        '''
+        if self.driver:
+            self.restarts += 1
+            print(f"Restarting Chrome session ({self.restarts})")
+        self.setup()
+
+    def reset(self):
+        '''
+        Reset page and frame state between companies: back to the main window and top document.
+        '''
+        try:
+            handles = self.driver.window_handles
+            for handle in handles[1:]: # close popups opened by the previous company
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(handles[0])
+            self.driver.switch_to.default_content()
+            return True
+        except: return False
     
     def extract_row_texts(self, row, display_only: bool = True):
         '''
@@ -298,16 +750,40 @@ class TableScraper(ChromeDriver):
         )
         return values
 
-    def table_to_dicts(self, tbody_selector: str, row_to_dict: Callable):
+    def table_values(self, tbody_selector: str, display_only: bool = True):
+        '''
+        Return the cell texts of every (visible) row in 'tbody_selector' as a list of lists, in one script call.
+        '''
+        values = self.driver.execute_script(TABLE_VALUES_SCRIPT, tbody_selector, display_only)
+        if values is None: raise LookupError(f"{tbody_selector} not found")
+        return values
+
+    @TRACER.traced("grid_values")
+    def grid_values(self, grid_id: str):
+        '''
+        Return every row held by the WebSquare gridView 'grid_id' as lists of display texts,
+        or None if the page does not expose the grid API.
+        '''
+        try: return self.driver.execute_script(GRID_MODEL_SCRIPT, grid_id)
+        except: return None
+
+    @TRACER.traced("table_to_dicts")
+    def table_to_dicts(self, tbody_selector: str, row_to_dict: Callable, batch: bool = True):
         '''
         Parse a table body into a list of dictionaries using a provided row_to_dict mapper.
+        With 'batch', rows are returned as lists of cell texts read in a single round trip;
+        otherwise they are the row WebElements, read one by one.
         '''
-        tbody = self.driver.find_element(By.CSS_SELECTOR, tbody_selector)
-        rows = tbody.find_elements(By.TAG_NAME, "tr")
+        if batch:
+            rows = self.table_values(tbody_selector)
+            row_values = rows
+        else:
+            tbody = self.driver.find_element(By.CSS_SELECTOR, tbody_selector)
+            rows = tbody.find_elements(By.TAG_NAME, "tr")
+            row_values = (self.extract_row_texts(row) for row in rows)
 
         data_dicts = []
-        for row in rows:
-            values = self.extract_row_texts(row)
+        for values in row_values:
             if values is None: continue # Skip invalid row
             try:
                 mapped = row_to_dict(values)
@@ -318,9 +794,11 @@ class TableScraper(ChromeDriver):
     def get_page_key(self, rows):
         '''
         Generate a simple page key using first row's cell texts.
+        Accepts rows from either table_to_dicts mode; batch rows need no extra round trip.
         '''
         if not rows: return None
         first_row = rows[0]
+        if isinstance(first_row, (list, tuple)): return "|".join(first_row) if first_row else None
         td_cells = first_row.find_elements(By.TAG_NAME, "td")
         if not td_cells: return None
         values = self.driver.execute_script(
@@ -335,4 +813,4 @@ class TableScraper(ChromeDriver):
         )
         return "|".join(values) if values else None
 
-__all__ = ['ChromeDriver', 'Finder', 'TableScraper']
+__all__ = ['ChromeDriver', 'Finder', 'TableScraper', 'ScrapeCancelled', 'frame_loaded', 'items_present', 'element_hidden', 'value_equals', 'table_rendered', 'response_captured', 'first_of', 'request_done']
@@ -1,23 +1,202 @@
+import os
+import gzip
 import json
-from google.cloud import storage
+import time
+import uuid
+import threading
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024 # objects above this size use resumable (chunked, retried) uploads
+CHUNK_SIZE = 8 * 1024 * 1024          # multiple of 256 KiB, as the resumable upload API requires
+
+class LocalBackend:
+    '''
+    Filesystem stand-in for a bucket: blob "a/b.ndjson.gz" is stored as <root>/a/b.ndjson.gz.
+    Used for offline runs and tests; writes are atomic like the other local outputs.
+    '''
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, *name.split("/"))
+
+    def upload(self, name: str, data: bytes, content_type: str = "application/octet-stream"):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f: f.write(data)
+        os.replace(tmp_path, path)
+
+    def download(self, name: str):
+        try:
+            with open(self._path(name), "rb") as f: return f.read()
+        except FileNotFoundError: return None
+
+    def list(self, prefix: str = "") -> list:
+        names = []
+        for folder, _, files in os.walk(self.root):
+            for filename in files:
+                if filename.endswith(".tmp"): continue
+                name = os.path.relpath(os.path.join(folder, filename), self.root).replace(os.sep, "/")
+                if name.startswith(prefix): names.append(name)
+        return sorted(names)
+
+class GcsBackend:
+    '''
+    Google Cloud Storage bucket behind one storage.Client, created on first use and reused for every call.
+    'emulator_host' (e.g. "http://localhost:4443") points the client at a local GCS emulator such as fake-gcs-server.
+    '''
+    def __init__(self, bucket_name: str, client=None, emulator_host: str = None):
+        self.bucket_name = bucket_name
+        self.emulator_host = emulator_host or os.environ.get("STORAGE_EMULATOR_HOST")
+        self._client = client
+        self._bucket = None
+        self._lock = threading.Lock()
+
+    @property
+    def bucket(self):
+        with self._lock:
+            if self._bucket is None:
+                if self._client is None:
+                    from google.cloud import storage # only needed for the cloud backend
+                    if self.emulator_host:
+                        from google.auth.credentials import AnonymousCredentials
+                        self._client = storage.Client(project="local", credentials=AnonymousCredentials(),
+                                                      client_options={"api_endpoint": self.emulator_host})
+                    else:
+                        self._client = storage.Client()
+                self._bucket = self._client.bucket(self.bucket_name)
+            return self._bucket
+
+    def upload(self, name: str, data: bytes, content_type: str = "application/octet-stream"):
+        from google.cloud.storage.retry import DEFAULT_RETRY
+        blob = self.bucket.blob(name)
+        if len(data) > RESUMABLE_THRESHOLD: blob.chunk_size = CHUNK_SIZE
+        # Object names are deterministic, so a retried or repeated upload just rewrites the same object
+        blob.upload_from_string(data, content_type=content_type, retry=DEFAULT_RETRY)
+
+    def download(self, name: str):
+        from google.api_core.exceptions import NotFound
+        try: return self.bucket.blob(name).download_as_bytes()
+        except NotFound: return None
+
+    def list(self, prefix: str = "") -> list:
+        return sorted(blob.name for blob in self.bucket.client.list_blobs(self.bucket_name, prefix=prefix))
+
+class BatchWriter:
+    '''
+    Batches records into gzip-compressed NDJSON objects partitioned by date and company:
+        <prefix>/<table>/date=YYYY-MM-DD/company=<name>/part-<run id>-<seq>.ndjson.gz
+    Every 'batch_size' records the buffered partitions are spooled to 'spool_dir' and uploaded by
+    'workers' threads. A spooled batch (<run id>-<seq>.gz, with its object name in <run id>-<seq>.name) is
+    deleted only once uploaded, so batches left by an interrupted or offline run are uploaded first by the
+    next writer on the same spool dir.
+    'partition' maps a record to its (date, company); the default is today's date and the record's title.
+    '''
+    def __init__(self, backend, prefix: str = "", batch_size: int = 1000, workers: int = 4,
+                 spool_dir: str = None, partition=None):
+        self.backend = backend
+        self.prefix = prefix.strip("/")
+        self.batch_size = batch_size
+        self.spool_dir = spool_dir or os.path.join(os.path.expanduser("~"), ".kind-gcs-spool")
+        self.partition = partition or self.by_company
+        self.today = time.strftime("%Y-%m-%d")
+        self.run_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.buffers = {} # (table, date, company) -> [ndjson lines]
+        self.buffered = 0
+        self.seq = 0
+        self.uploaded = [] # object names uploaded by this writer
+        self.failed = {}   # spool path -> error
+        self.futures = []
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.resume()
+
+    def by_company(self, record: dict):
+        return self.today, record.get("title") or ""
+
+    def object_name(self, table: str, day: str, company: str) -> str:
+        self.seq += 1
+        parts = [self.prefix] if self.prefix else []
+        parts += [table, f"date={day}", f"company={quote(company, safe='')}", f"part-{self.run_id}-{self.seq:05d}.ndjson.gz"]
+        return "/".join(parts)
+
+    def add(self, records, table: str = "DB"):
+        for record in records:
+            day, company = self.partition(record)
+            self.buffers.setdefault((table, day, company), []).append(json.dumps(record, ensure_ascii=False) + "\n")
+            self.buffered += 1
+        if self.buffered >= self.batch_size: self.flush()
+
+    def flush(self):
+        '''
+        Compress the buffered partitions, spool them and queue their uploads.
+        '''
+        buffers, self.buffers, self.buffered = self.buffers, {}, 0
+        for (table, day, company), lines in buffers.items():
+            name = self.object_name(table, day, company)
+            spool_path = os.path.join(self.spool_dir, f"{self.run_id}-{self.seq:05d}.gz")
+            with open(spool_path[:-3] + ".name", "w", encoding="utf-8") as f: f.write(name)
+            with open(spool_path + ".tmp", "wb") as f: f.write(gzip.compress("".join(lines).encode("utf-8")))
+            os.replace(spool_path + ".tmp", spool_path) # the batch counts as spooled only once complete
+            self.futures.append(self.executor.submit(self._upload, spool_path, name))
+
+    def resume(self):
+        # Upload batches spooled by earlier writers that never reached the bucket
+        for filename in sorted(os.listdir(self.spool_dir)):
+            if not filename.endswith(".gz"): continue
+            spool_path = os.path.join(self.spool_dir, filename)
+            with open(spool_path[:-3] + ".name", "r", encoding="utf-8") as f: name = f.read()
+            self.futures.append(self.executor.submit(self._upload, spool_path, name))
+
+    def _upload(self, spool_path: str, name: str):
+        try:
+            with open(spool_path, "rb") as f: data = f.read()
+            self.backend.upload(name, data, content_type="application/x-ndjson")
+            os.remove(spool_path)
+            os.remove(spool_path[:-3] + ".name")
+            self.uploaded.append(name)
+        except Exception as e:
+            self.failed[spool_path] = str(e)
+
+    def wait(self) -> bool:
+        # Block until every queued upload finished; False if some stay spooled for the next run
+        futures, self.futures = self.futures, []
+        for future in futures: future.result()
+        return not self.failed
+
+    def close(self) -> bool:
+        self.flush()
+        ok = self.wait()
+        self.executor.shutdown()
+        for spool_path, error in self.failed.items(): print(f"Upload failed, kept for the next run: {spool_path} ({error})")
+        return ok
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
 
 class GCS:
-    def __init__(self, bucket_name):
+    '''
+    Read and write JSON documents and batched NDJSON records in a bucket.
+    'backend' replaces the bucket (e.g. LocalBackend(dir) for offline runs); by default one GcsBackend,
+    and so one storage.Client, is shared by every call on this instance.
+    '''
+    def __init__(self, bucket_name, backend=None, emulator_host: str = None):
         self.bucket_name = bucket_name
+        self.backend = backend or GcsBackend(bucket_name, emulator_host=emulator_host)
 
     def save(self, data, blob_name, local = False):
         # Saves Python dict as a .json file to GCS. Blob name is required.
         try:
-            json_content = json.dumps(data, ensure_ascii=False, indent=2)
+            json_content = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
             if local:
                 with open(blob_name, "w", encoding='utf-8') as f:
                     f.write(json_content)
                 return True
             else:
-                client = storage.Client()
-                bucket = client.bucket(self.bucket_name)
-                blob = bucket.blob(blob_name)
-                blob.upload_from_string(json_content, content_type='application/json; charset=utf-8')
+                self.backend.upload(blob_name, json_content.encode("utf-8"), content_type='application/json; charset=utf-8')
                 return True
         except Exception as e:
             print(f"Error saving JSON dict to GCS: {e}")
@@ -32,13 +211,26 @@ class GCS:
                     content = f.read()
                     return json.loads(content) if content else False
             else:
-                client = storage.Client()
-                bucket = client.bucket(self.bucket_name)
-                blob = bucket.blob(blob_name)
-                if not blob.exists(): return False
-                content = blob.download_as_text(encoding='utf-8')
-                return json.loads(content) if content else False
+                content = self.backend.download(blob_name)
+                return json.loads(content.decode("utf-8")) if content else False
         except Exception:
             return False
 
-__all__ = ['GCS']
+    def writer(self, prefix: str = "", batch_size: int = 1000, workers: int = 4, spool_dir: str = None, partition=None):
+        '''
+        BatchWriter for compressed, partitioned NDJSON uploads under 'prefix'.
+        '''
+        return BatchWriter(self.backend, prefix, batch_size=batch_size, workers=workers, spool_dir=spool_dir, partition=partition)
+
+    def read_records(self, prefix: str = "", contains: str = "") -> list:
+        '''
+        All records of the .ndjson.gz objects under 'prefix' (optionally only names containing 'contains').
+        '''
+        records = []
+        for name in self.backend.list(prefix):
+            if not name.endswith(".ndjson.gz") or contains not in name: continue
+            data = self.backend.download(name)
+            if data: records.extend(json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines() if line)
+        return records
+
+__all__ = ['GCS', 'BatchWriter', 'LocalBackend', 'GcsBackend']
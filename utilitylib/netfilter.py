@@ -0,0 +1,82 @@
+from fnmatch import fnmatch
+
+# URL patterns (DevTools wildcard syntax) per resource type
+RESOURCE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.svg*", "*.ico*", "*.webp*", "*.bmp*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*"],
+    "stylesheet": ["*.css*"],
+    "script": ["*.js*"],
+}
+
+# Analytics and ad hosts SEIBRO pages load; none of them affect the data
+TRACKER_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*wcs.naver.net*",
+]
+
+# Resources the scraper needs; deny patterns overlapping these are not applied
+DEFAULT_ALLOW = [
+    "*/websquare/*.js*",
+    "*/websquare/*.css*",
+]
+
+# Per-resource transfer sizes of the current page (document + subresources), from the Performance API.
+# transferSize is 0 for resources served from the browser cache.
+PAGE_BYTES_SCRIPT = """
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+var bytes = 0, cached = 0;
+for (var i = 0; i < entries.length; i++) {
+  bytes += entries[i].transferSize || 0;
+  if (!entries[i].transferSize && entries[i].decodedBodySize) cached++;
+}
+return [bytes, entries.length, cached];
+"""
+
+class NetworkFilter:
+    '''
+    Blocks heavy page resources through DevTools (Network.setBlockedURLs) while keeping the browser cache on,
+    so the WebSquare bundles stay warm between companies.
+    'block_types' are keys of RESOURCE_PATTERNS, 'block_urls' extra URL patterns and 'allow_urls' patterns
+    that must keep loading. DevTools URL blocking has no exceptions, so a deny pattern that overlaps an
+    allow pattern is dropped rather than risk blocking the page's own code.
+    '''
+    def __init__(self, block_types=("image", "font", "media"), block_urls=TRACKER_PATTERNS, allow_urls=DEFAULT_ALLOW):
+        unknown = [t for t in block_types if t not in RESOURCE_PATTERNS]
+        if unknown: raise ValueError(f"Unknown resource types: {unknown}")
+        self.block_types = tuple(block_types)
+        self.block_urls = list(block_urls)
+        self.allow_urls = list(allow_urls)
+
+    @property
+    def patterns(self) -> list:
+        denied = [p for t in self.block_types for p in RESOURCE_PATTERNS[t]] + self.block_urls
+        return [p for p in denied if not any(fnmatch(allow, p) or fnmatch(p, allow) for allow in self.allow_urls)]
+
+    def prefs(self) -> dict:
+        # Chrome content setting that really stops image loading (the --disable-images switch is ignored)
+        return {"profile.managed_default_content_settings.images": 2} if "image" in self.block_types else {}
+
+    def apply(self, driver):
+        '''
+        Install the filter on a running Chrome session. Returns False if DevTools commands are unavailable.
+        '''
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": False})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns})
+            return True
+        except Exception as e:
+            print(f"Network filter not applied: {e}")
+            return False
+
+def page_bytes(driver):
+    '''
+    (bytes transferred, resources loaded, resources served from cache) for the current page, None if unavailable.
+    '''
+    try: return tuple(driver.execute_script(PAGE_BYTES_SCRIPT))
+    except Exception: return None
+
+__all__ = ['NetworkFilter', 'RESOURCE_PATTERNS', 'TRACKER_PATTERNS', 'DEFAULT_ALLOW', 'page_bytes']
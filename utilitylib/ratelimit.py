@@ -0,0 +1,160 @@
+import time
+import threading
+import multiprocessing
+
+# Text seen on pages/responses when SEIBRO throttles a client
+BLOCK_MARKERS = [
+    "접근이 차단",
+    "접속이 차단",
+    "비정상적인 접근",
+    "일시적으로 접속",
+    "잠시 후 다시",
+    "Access Denied",
+    "Too Many Requests",
+]
+BLOCK_STATUS = {403, 429, 503}
+
+class BlockedError(RuntimeError):
+    '''
+    Raised when SEIBRO keeps answering with block pages after the cooldowns.
+    '''
+
+class ScrapeCancelled(BaseException):
+    '''
+    Raised from inside driver calls once 'cancel' is set. Derives from BaseException (like
+    KeyboardInterrupt) so the scraping loops' broad 'except Exception' handlers let it through.
+    '''
+
+def is_block_text(text: str) -> bool:
+    '''
+    True if 'text' (page title/body or response body) looks like a block page.
+    '''
+    if not text: return False
+    return any(marker in text for marker in BLOCK_MARKERS)
+
+class RateGovernor:
+    '''
+    Token bucket with AIMD rate control shared by all SEIBRO traffic.
+    acquire() blocks until a request may be sent. success() raises the rate additively,
+    failure() cuts it multiplicatively, blocked() also pauses everything for a growing cooldown.
+    '''
+    def __init__(self, rate: float = 2.0, burst: int = 3, min_rate: float = 0.2, max_rate: float = 4.0,
+                 increase: float = 0.05, decrease: float = 0.5, cooldown: float = 30.0, max_cooldown: float = 300.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.blocks = 0       # consecutive blocks, drives the cooldown length
+        self.stats = {"requests": 0, "waited": 0.0, "failures": 0, "blocks": 0}
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, kind: str = "request", cancel=None) -> float:
+        '''
+        Take one token, sleeping as needed. Returns the seconds spent waiting.
+        A set 'cancel' event (threading or multiprocessing) ends the sleep, including a block cooldown, with ScrapeCancelled.
+        '''
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until: delay = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.stats["requests"] += 1
+                    self.stats["waited"] += waited
+                    return waited
+                else: delay = (1 - self.tokens) / self.rate
+            if cancel is None: time.sleep(delay)
+            elif cancel.wait(delay): raise ScrapeCancelled()
+            waited += delay
+
+    def success(self):
+        with self.lock:
+            self.blocks = 0
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def failure(self):
+        with self.lock:
+            self.stats["failures"] += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+
+    def blocked(self):
+        with self.lock:
+            self.stats["blocks"] += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            pause = min(self.max_cooldown, self.cooldown * (2 ** self.blocks))
+            self.blocks += 1
+            self.paused_until = time.monotonic() + pause
+            self.tokens = 0.0
+        print(f"SEIBRO block detected, pausing {pause:.0f}s (rate now {self.rate:.2f}/s)")
+
+    def report(self, status: int = 200, text: str = "") -> bool:
+        '''
+        Classify a response and adjust the rate. Returns False if it was a block.
+        '''
+        if status in BLOCK_STATUS or is_block_text(text):
+            self.blocked(); return False
+        if status >= 400: self.failure()
+        else: self.success()
+        return True
+
+class SharedStats:
+    '''
+    The 'stats' counters of a SharedRateGovernor in shared memory, so the parent sees every worker's requests.
+    Reads like the plain dict (stats["requests"], dict(stats)); updated under the governor's lock.
+    '''
+    KEYS = ("requests", "waited", "failures", "blocks")
+
+    def __init__(self, ctx, initial: dict):
+        self.values = ctx.Array("d", len(self.KEYS), lock=False)
+        for key, value in initial.items(): self[key] = value
+
+    def __getitem__(self, key):
+        value = self.values[self.KEYS.index(key)]
+        return value if key == "waited" else int(value)
+
+    def __setitem__(self, key, value): self.values[self.KEYS.index(key)] = value
+
+    def keys(self): return self.KEYS
+
+    def items(self): return [(key, self[key]) for key in self.KEYS]
+
+class SharedRateGovernor(RateGovernor):
+    '''
+    RateGovernor whose bucket and counters live in shared memory, so worker processes draw from one budget
+    and the parent's stats cover all of them. Create it in the parent and pass it to the processes as an argument.
+    '''
+    _shared = ("rate", "tokens", "updated", "paused_until", "blocks")
+
+    def __init__(self, ctx=None, **kwargs):
+        ctx = ctx or multiprocessing.get_context()
+        object.__setattr__(self, "_state", ctx.Array("d", len(self._shared), lock=False))
+        super().__init__(**kwargs)
+        self.stats = SharedStats(ctx, self.stats)
+        self.lock = ctx.Lock() # guards _state and stats across processes
+
+    def __getattr__(self, name):
+        if name in SharedRateGovernor._shared:
+            return self._state[SharedRateGovernor._shared.index(name)]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in SharedRateGovernor._shared: self._state[self._shared.index(name)] = value
+        else: object.__setattr__(self, name, value)
+
+DEFAULT_GOVERNOR = RateGovernor()
+
+__all__ = ['RateGovernor', 'SharedRateGovernor', 'DEFAULT_GOVERNOR', 'BlockedError', 'ScrapeCancelled', 'is_block_text', 'BLOCK_MARKERS']
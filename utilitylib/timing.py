@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import deque
+
+from .tracing import percentile
+
+# (min, max) seconds a learned timeout may take per action; actions not listed use "default"
+TIMEOUT_BOUNDS = {
+    "load": (5, 60),     # page loads
+    "frame": (2, 30),
+    "items": (2, 30),
+    "table": (2, 30),
+    "hidden": (1, 15),
+    "value": (0.5, 5),
+    "request": (2, 30),  # in-page service calls
+    "fetch": (3, 60),    # HTTP backend service calls
+    "default": (1, 60),
+}
+BUFFER_BOUNDS = (0.05, 2.0)
+BUFFER_ACTIONS = ("items", "table", "hidden") # how long the page usually takes to react to a click
+
+class AdaptiveTimers:
+    '''
+    Rolling latency samples per action (wait condition name, "load", "fetch") and the timeouts derived from them.
+    timeout() is the 'quantile' percentile times 'margin', buffer() the median reaction time, both clamped to
+    their bounds; with fewer than 'min_samples' samples the caller's default is kept. A wait that timed out
+    counts at its timeout, so a slow period pushes the timeouts up; these samples are kept apart, each success
+    retires one of them and they are never saved, so the timeouts come back down once waits succeed again and
+    the next run starts from the latencies actually measured.
+    The measured samples are kept in 'path' between runs.
+    '''
+    def __init__(self, path: str = None, window: int = 200, min_samples: int = 5, quantile: float = 95, margin: float = 1.5,
+                 bounds: dict = None, buffer_bounds: tuple = BUFFER_BOUNDS):
+        self.path = path
+        self.window = window
+        self.min_samples = min_samples
+        self.quantile = quantile
+        self.margin = margin
+        self.bounds = {**TIMEOUT_BOUNDS, **(bounds or {})}
+        self.buffer_bounds = buffer_bounds
+        self.samples = {}  # action -> deque of seconds
+        self.expired = {}  # action -> deque of timeouts that expired this run (not saved, not drained)
+        self.fresh = {}    # action -> samples since the last drain(), handed from pool workers to the parent
+        self.timeouts = {} # action -> timeouts that expired this run
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        if not self.path: return self
+        try:
+            with open(self.path, "r", encoding="utf-8") as f: saved = json.load(f).get("samples", {})
+        except FileNotFoundError: saved = {}
+        except Exception as e:
+            print(f"Failed to load learned timers, starting from the defaults: {e}")
+            saved = {}
+        self.samples = {action: deque(values[-self.window:], maxlen=self.window) for action, values in saved.items()}
+        return self
+
+    def save(self):
+        if not self.path or not self.dirty: return self.path
+        output_dir = os.path.dirname(self.path) or "."
+        os.makedirs(output_dir, exist_ok=True)
+        with self.lock: state = {"updated": time.strftime("%Y-%m-%d %H:%M:%S"), "chosen": self._report(),
+                                 "samples": {action: [round(v, 4) for v in values] for action, values in self.samples.items()}}
+        fd, tmp_path = tempfile.mkstemp(suffix=".json", prefix=".timers-", dir=output_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        return self.path
+
+    def observe(self, action: str, seconds: float, timed_out: bool = False):
+        '''
+        Record one latency of 'action'; a timed-out wait passes its timeout with timed_out=True.
+        '''
+        if not action: return
+        with self.lock:
+            if timed_out:
+                self.expired.setdefault(action, deque(maxlen=self.window)).append(seconds)
+                self.timeouts[action] = self.timeouts.get(action, 0) + 1
+                return
+            self.samples.setdefault(action, deque(maxlen=self.window)).append(seconds)
+            self.fresh.setdefault(action, []).append(seconds)
+            if self.expired.get(action): self.expired[action].popleft() # each success retires one expired wait
+            self.dirty = True
+
+    def drain(self) -> dict:
+        '''
+        Samples recorded since the last drain(), for merge() into another instance.
+        '''
+        with self.lock:
+            fresh, self.fresh = self.fresh, {}
+            return fresh
+
+    def merge(self, samples: dict):
+        with self.lock:
+            for action, values in (samples or {}).items():
+                self.samples.setdefault(action, deque(maxlen=self.window)).extend(values)
+                self.dirty = True
+
+    def _clamp(self, action: str, seconds: float) -> float:
+        low, high = self.bounds.get(action, self.bounds["default"])
+        return round(min(high, max(low, seconds)), 3)
+
+    def _learned(self, action: str):
+        # Timeout from the measured samples plus this run's expired ones, None until enough samples
+        values = list(self.samples.get(action, ())) + list(self.expired.get(action, ()))
+        if len(values) < self.min_samples: return None
+        return self._clamp(action, percentile(values, self.quantile) * self.margin)
+
+    def timeout(self, action: str, default: float) -> float:
+        '''
+        Timeout for 'action': margin x the learned percentile within the action's bounds, 'default' until enough samples.
+        '''
+        with self.lock: learned = self._learned(action)
+        return default if learned is None else learned
+
+    def buffer(self, default: float) -> float:
+        '''
+        Settle/fallback sleep: the median reaction time of BUFFER_ACTIONS within 'buffer_bounds'.
+        '''
+        with self.lock: values = [v for action in BUFFER_ACTIONS for v in self.samples.get(action, ())]
+        if len(values) < self.min_samples: return default
+        low, high = self.buffer_bounds
+        return round(min(high, max(low, percentile(values, 50))), 3)
+
+    def _report(self) -> dict:
+        actions = {}
+        for action in set(self.samples) | set(self.expired):
+            values = list(self.samples.get(action, ()))
+            actions[action] = {
+                "samples": len(values),
+                "p50": round(percentile(values, 50), 3) if values else None,
+                "p95": round(percentile(values, 95), 3) if values else None,
+                "timeout": self._learned(action),
+                "timeouts": self.timeouts.get(action, 0),
+            }
+        return actions
+
+    def report(self, defaults: dict = None) -> dict:
+        '''
+        The values in use: {"buffer_time", "actions": {action: {"samples", "p50", "p95", "timeout", "timeouts"}}}.
+        "timeout" is None while an action still uses its default.
+        '''
+        buffer = self.buffer((defaults or {}).get("buffer_time", 0.3))
+        with self.lock: actions = self._report()
+        return {"buffer_time": buffer, "actions": actions}
+
+__all__ = ['AdaptiveTimers', 'TIMEOUT_BOUNDS', 'BUFFER_BOUNDS']
@@ -0,0 +1,170 @@
+import csv
+import math
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+def percentile(values: list, q: float) -> float:
+    '''
+    Nearest-rank percentile of 'values' (q in 0-100).
+    '''
+    if not values: return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+class Tracer:
+    '''
+    Collects timing spans per step and per company.
+    with tracer.company("name"): ... groups the spans of one company; with tracer.span("step"): ... times a step.
+    '''
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.spans = []      # (company, step, seconds)
+        self.companies = []  # (company, wall seconds)
+        self.metrics = []    # (company, name, value): non-time quantities such as bytes per page
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.spans, self.companies, self.metrics = [], [], []
+
+    @property
+    def current(self) -> str:
+        return getattr(self.local, "company", "")
+
+    @contextmanager
+    def company(self, name: str):
+        previous = self.current
+        self.local.company = name
+        start = time.perf_counter()
+        try: yield
+        finally:
+            with self.lock: self.companies.append((name, time.perf_counter() - start))
+            self.local.company = previous
+
+    @contextmanager
+    def span(self, step: str):
+        if not self.enabled:
+            yield; return
+        start = time.perf_counter()
+        try: yield
+        finally: self.add(step, time.perf_counter() - start)
+
+    def add(self, step: str, seconds: float):
+        with self.lock: self.spans.append((self.current, step, seconds))
+
+    def metric(self, name: str, value: float):
+        '''
+        Record a non-time quantity (bytes, counts) for the current company.
+        '''
+        with self.lock: self.metrics.append((self.current, name, value))
+
+    def sleep(self, seconds: float):
+        '''
+        time.sleep that is recorded as a 'sleep' span, so fixed waits show up in the breakdown.
+        '''
+        with self.span("sleep"): time.sleep(seconds)
+
+    def bind(self, function):
+        '''
+        Wrap 'function' to record its spans under the calling thread's current company
+        (for work handed to another thread).
+        '''
+        company = self.current
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            previous = self.current
+            self.local.company = company
+            try: return function(*args, **kwargs)
+            finally: self.local.company = previous
+        return wrapper
+
+    def traced(self, step: str):
+        '''
+        Decorator timing every call of a function as 'step'.
+        '''
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(step): return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def breakdown(self) -> dict:
+        '''
+        Per-company totals: {company: {"wall": s, step: s, ...}}.
+        '''
+        result = {}
+        for company, seconds in self.companies:
+            result.setdefault(company, {})["wall"] = round(seconds, 4)
+        for company, step, seconds in self.spans:
+            steps = result.setdefault(company, {})
+            steps[step] = round(steps.get(step, 0.0) + seconds, 4)
+        for company, name, value in self.metrics:
+            steps = result.setdefault(company, {})
+            steps[name] = steps.get(name, 0) + value
+        return result
+
+    def summary(self) -> dict:
+        '''
+        Run-level statistics per step: {step: {"count", "total", "p50", "p95", "max"}}.
+        '''
+        by_step = {}
+        for _, step, seconds in self.spans: by_step.setdefault(step, []).append(seconds)
+        walls = [seconds for _, seconds in self.companies]
+        if walls: by_step["company"] = walls
+        return {step: {
+            "count": len(values),
+            "total": round(sum(values), 4),
+            "p50": round(percentile(values, 50), 4),
+            "p95": round(percentile(values, 95), 4),
+            "max": round(max(values), 4),
+        } for step, values in by_step.items()}
+
+    def metric_summary(self) -> dict:
+        '''
+        Run-level statistics per metric: {name: {"count", "total", "p50", "p95", "max"}}.
+        '''
+        by_name = {}
+        for _, name, value in self.metrics: by_name.setdefault(name, []).append(value)
+        return {name: {
+            "count": len(values),
+            "total": sum(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "max": max(values),
+        } for name, values in by_name.items()}
+
+    def report_lines(self) -> list:
+        '''
+        Human-readable run summary, one line per step, slowest total first.
+        '''
+        summary = self.summary()
+        lines = [f"{'step':<16}{'count':>7}{'total':>10}{'p50':>9}{'p95':>9}{'max':>9}"]
+        for step, s in sorted(summary.items(), key=lambda kv: -kv[1]["total"]):
+            lines.append(f"{step:<16}{s['count']:>7}{s['total']:>10.2f}{s['p50']:>9.3f}{s['p95']:>9.3f}{s['max']:>9.3f}")
+        for name, s in sorted(self.metric_summary().items()):
+            lines.append(f"{name:<16}{s['count']:>7}{s['total']:>10.0f}{s['p50']:>9.0f}{s['p95']:>9.0f}{s['max']:>9.0f}")
+        return lines
+
+    def export_json(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"summary": self.summary(), "metrics": self.metric_summary(), "companies": self.breakdown()}, f, ensure_ascii=False, indent=2)
+        return path
+
+    def export_csv(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["company", "step", "seconds"])
+            for company, seconds in self.companies: writer.writerow([company, "company", f"{seconds:.4f}"])
+            for company, step, seconds in self.spans: writer.writerow([company, step, f"{seconds:.4f}"])
+            for company, name, value in self.metrics: writer.writerow([company, name, value])
+        return path
+
+TRACER = Tracer()
+
+__all__ = ['Tracer', 'TRACER', 'percentile']
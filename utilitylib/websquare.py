@@ -0,0 +1,127 @@
+import json
+import time
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .ratelimit import DEFAULT_GOVERNOR, RateGovernor, BlockedError
+from .tracing import TRACER
+from .timing import AdaptiveTimers
+
+SERVICE_PATH = "/websquare/engine/proworks/callServletService.jsp"
+
+def build_request(action: str, task: str, params: dict = None) -> str:
+    '''
+    Build a WebSquare 'reqParam' XML body, e.g.
+    <reqParam action="..." task="..."><ISIN value="KR..."/></reqParam>
+    '''
+    fields = "".join(f"<{key} value={quoteattr(str(value))}/>" for key, value in (params or {}).items())
+    return f"<reqParam action={quoteattr(action)} task={quoteattr(task)}>{fields}</reqParam>"
+
+def parse_request(body: str):
+    '''
+    Inverse of build_request: return (action, task, params).
+    '''
+    root = ET.fromstring(body)
+    params = {child.tag: child.get("value", "") for child in root}
+    return root.get("action", ""), root.get("task", ""), params
+
+class ServiceError(ValueError):
+    '''
+    Raised for a service response without the expected row container: an error answer, an HTML page
+    (session expired, maintenance), or a renamed service. Such replies must not read as "no rows".
+    '''
+
+# Elements/keys WebSquare uses to report a failed service call
+ERROR_KEYS = ("error", "ERROR", "errorCode", "ERR_CD", "ERR_MSG", "errMsg", "exception")
+
+def parse_response(text: str) -> list:
+    '''
+    Parse a WebSquare service response into a list of row dictionaries.
+    XML responses look like <vector><data><result><FIELD value="..."/></result></data></vector>;
+    JSON responses are either a list of rows or an object holding one under 'data'/'result'.
+    Raises ServiceError for an empty body, an error answer or a document without that structure;
+    an empty <vector/> (or [] / {"data": []}) is a genuine empty result.
+    '''
+    text = (text or "").strip()
+    if not text: raise ServiceError("empty response")
+    if text[0] in "[{":
+        try: payload = json.loads(text)
+        except ValueError as e: raise ServiceError(f"unparsable JSON response: {e}") from e
+        if isinstance(payload, dict):
+            error = next((payload[key] for key in ERROR_KEYS if payload.get(key)), None)
+            if error: raise ServiceError(f"service error: {error}")
+            if "data" not in payload and "result" not in payload: raise ServiceError("JSON response without 'data'/'result'")
+            payload = payload.get("data", payload.get("result"))
+        if not isinstance(payload, list): raise ServiceError("JSON response rows are not a list")
+        return [dict(row) for row in payload]
+
+    try: root = ET.fromstring(text)
+    except ET.ParseError as e: raise ServiceError(f"unparsable response: {text[:80]!r}") from e
+    for key in ERROR_KEYS:
+        found = root if root.tag == key else root.find(f".//{key}")
+        if found is not None: raise ServiceError(f"service error: {found.get('value') or (found.text or '').strip() or key}")
+    vector = root if root.tag == "vector" else root.find(".//vector")
+    if vector is None: raise ServiceError(f"response without a <vector> row container (<{root.tag}>)")
+    rows = []
+    for result in vector.iter("result"):
+        rows.append({child.tag: child.get("value", child.text or "") for child in result})
+    return rows
+
+class WebSquareClient:
+    '''
+    Calls WebSquare services over one pooled keep-alive HTTP session (no browser).
+    '''
+    def __init__(self, base_url: str, referer: str = "", timeout: float = 10, pool_size: int = 4, retries: int = 2,
+                 governor: RateGovernor = None, timers: AdaptiveTimers = None, cancel=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.timers = timers # learns the "fetch" timeout from response times; None: always 'timeout'
+        self.governor = governor or DEFAULT_GOVERNOR
+        self.cancel = cancel # Event that ends a wait for the governor (e.g. a block cooldown) with ScrapeCancelled
+
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=[502, 504], allowed_methods=["POST"])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Content-Type": 'application/xml; charset="UTF-8"',
+            "Accept": "application/xml, text/xml, */*",
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+            "Referer": referer or self.base_url,
+        })
+
+    @TRACER.traced("fetch")
+    def call(self, action: str, task: str, params: dict = None) -> list:
+        '''
+        POST one service request and return its parsed rows. Raises on HTTP errors, and ServiceError on answers that are not a row list.
+        Every call goes through the rate governor; block answers are retried after its cooldown.
+        '''
+        body = build_request(action, task, params).encode("utf-8")
+        timeout = self.timers.timeout("fetch", self.timeout) if self.timers else self.timeout
+        for _ in range(3):
+            TRACER.add("rate_wait", self.governor.acquire("fetch", self.cancel))
+            start = time.perf_counter()
+            try: response = self.session.post(self.base_url + SERVICE_PATH, data=body, timeout=timeout)
+            except requests.Timeout:
+                if self.timers: self.timers.observe("fetch", timeout, timed_out=True)
+                raise
+            if self.timers: self.timers.observe("fetch", time.perf_counter() - start)
+            text = response.content.decode("utf-8", errors="replace") # SEIBRO always answers in UTF-8
+            if self.governor.report(response.status_code, text): break
+        else: raise BlockedError(f"{action} is still blocked")
+        response.raise_for_status()
+        return parse_response(text)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
+
+__all__ = ['WebSquareClient', 'ServiceError', 'build_request', 'parse_request', 'parse_response', 'SERVICE_PATH']
@@ -0,0 +1,428 @@
+import os
+import sys
+import hmac
+import json
+import time
+import socket
+import secrets
+import signal
+import sqlite3
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    pos INTEGER PRIMARY KEY, bond TEXT NOT NULL, company TEXT NOT NULL, from_date TEXT NOT NULL, to_date TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', worker TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT, error TEXT, updated REAL);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (status, pos);
+CREATE INDEX IF NOT EXISTS tasks_by_company ON tasks (company);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# A task can be claimed while pending, or while leased with an expired lease (its worker died or stalled)
+CLAIMABLE = "(status = 'pending' OR (status = 'leased' AND lease_until < ?))"
+
+class QueueMismatch(ValueError):
+    '''
+    Raised when seeding a queue that already holds a different list, end date or start date.
+    '''
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class WorkQueue:
+    '''
+    Company list shared by several scraping nodes through one SQLite file (WAL mode).
+    Workers claim a company's bonds with an expiring lease, extend it with heartbeat() while scraping,
+    and report() each bond's result; bonds whose lease expires go back to the queue for another worker.
+    A bond that fails 'max_attempts' times is marked failed instead of being retried forever.
+    '''
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock() # one connection, shared by the coordinator's request threads
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def _write(self, fn):
+        # Run fn(conn) in an immediate transaction, so concurrent claims cannot pick the same rows
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self.conn)
+                self.conn.execute("COMMIT")
+                return value
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def seed(self, items: list, from_dates: list, to_date: str, reset: bool = False, from_date: str = None) -> int:
+        '''
+        Queue the [bond_name, company] list (positions as in the list) with each bond's window.
+        'from_date' is the start the windows were derived from (e.g. through a store's last dates). Seeding the same
+        list, 'to_date' and 'from_date' again is a no-op, so every node may run it, even though its own store would
+        give other windows; without 'from_date' the windows themselves are compared. A queue holding anything else
+        raises QueueMismatch, unless 'reset' drops its tasks (and their results) first. Returns the number of new tasks.
+        '''
+        tasks = [(pos, item[0], item[1], from_dates[pos], to_date) for pos, item in enumerate(items)]
+        def seed(conn):
+            queued = [tuple(row) for row in conn.execute("SELECT pos, bond, company, from_date, to_date FROM tasks ORDER BY pos")]
+            if queued and reset:
+                conn.execute("DELETE FROM tasks")
+                conn.execute("DELETE FROM meta")
+            elif queued:
+                seeded = conn.execute("SELECT value FROM meta WHERE key = 'from_date'").fetchone()
+                compare = (lambda task: (*task[:3], task[4])) if from_date and seeded else (lambda task: task)
+                changed = sum(1 for old, new in zip(queued, tasks) if compare(old) != compare(new)) + abs(len(queued) - len(tasks))
+                if from_date and seeded and seeded[0] != from_date:
+                    raise QueueMismatch(f"the queue was seeded from {seeded[0]}, not {from_date}; "
+                                        "seed with reset=True (--reset) to replace it")
+                if changed:
+                    raise QueueMismatch(f"the queue holds another list or end date ({len(queued)} queued, {len(tasks)} given, "
+                                        f"{changed} differ); seed with reset=True (--reset) to replace it")
+                return 0
+            now = time.time()
+            conn.executemany("INSERT INTO tasks (pos, bond, company, from_date, to_date, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                             [(*task, now) for task in tasks])
+            if from_date: conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('from_date', ?)", (from_date,))
+            return len(tasks)
+        return self._write(seed)
+
+    def claim(self, worker: str, lease: float = 300) -> list:
+        '''
+        Lease every claimable bond of the next company for 'lease' seconds.
+        Returns [{"pos", "bond", "company", "from_date", "to_date"}], empty when nothing is left to claim.
+        An expired lease that already used 'max_attempts' attempts is marked failed instead of claimed again.
+        '''
+        def claim(conn):
+            now = time.time()
+            conn.execute("UPDATE tasks SET status = 'failed', worker = NULL, lease_until = NULL, "
+                         "error = COALESCE(error, 'lease expired'), updated = ? "
+                         "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?", (now, now, self.max_attempts))
+            first = conn.execute(f"SELECT company FROM tasks WHERE {CLAIMABLE} ORDER BY pos LIMIT 1", (now,)).fetchone()
+            if not first: return []
+            rows = conn.execute(f"SELECT pos, bond, company, from_date, to_date FROM tasks WHERE company = ? AND {CLAIMABLE} "
+                                "ORDER BY pos", (first[0], now)).fetchall()
+            conn.executemany("UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? "
+                             "WHERE pos = ?", [(worker, now + lease, now, row[0]) for row in rows])
+            return [dict(zip(("pos", "bond", "company", "from_date", "to_date"), row)) for row in rows]
+        return self._write(claim)
+
+    def heartbeat(self, worker: str, positions: list, lease: float = 300) -> int:
+        '''
+        Extend the worker's leases on 'positions'. Returns how many it still holds.
+        '''
+        now = time.time()
+        return self._write(lambda conn: conn.executemany(
+            "UPDATE tasks SET lease_until = ?, updated = ? WHERE pos = ? AND worker = ? AND status = 'leased'",
+            [(now + lease, now, pos, worker) for pos in positions]).rowcount)
+
+    def report(self, worker: str, pos: int, result: dict) -> bool:
+        '''
+        Store a bond's result ({"DB": rows, "EX": rows}). The first report wins, also after a lease was reassigned.
+        '''
+        return self._write(lambda conn: conn.execute(
+            "UPDATE tasks SET status = 'done', worker = ?, result = ?, error = NULL, updated = ? WHERE pos = ? AND status != 'done'",
+            (worker, json.dumps(result, ensure_ascii=False), time.time(), pos)).rowcount) == 1
+
+    def release(self, worker: str, pos: int, error: str = None, retry: bool = True):
+        '''
+        Give a leased bond back: pending again, or failed once it used up its attempts (or with retry=False).
+        An attempt released without an error (e.g. the node was blocked or stopped) is not counted.
+        '''
+        def release(conn):
+            row = conn.execute("SELECT attempts FROM tasks WHERE pos = ? AND worker = ? AND status = 'leased'", (pos, worker)).fetchone()
+            if not row: return
+            attempts = row[0] if error else row[0] - 1
+            status = "failed" if not retry or attempts >= self.max_attempts else "pending"
+            conn.execute("UPDATE tasks SET status = ?, worker = NULL, lease_until = NULL, attempts = ?, error = ?, updated = ? "
+                         "WHERE pos = ?", (status, attempts, error, time.time(), pos))
+        self._write(release)
+
+    def status(self) -> dict:
+        with self.lock:
+            counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+            expired = self.conn.execute("SELECT COUNT(*) FROM tasks WHERE status = 'leased' AND lease_until < ?", (time.time(),)).fetchone()[0]
+            workers = [row[0] for row in self.conn.execute("SELECT DISTINCT worker FROM tasks WHERE status = 'leased'")]
+        return {"pending": counts.get("pending", 0), "leased": counts.get("leased", 0), "done": counts.get("done", 0),
+                "failed": counts.get("failed", 0), "expired": expired, "workers": workers}
+
+    def results(self) -> list:
+        '''
+        Finished bonds in list order: [(pos, bond, company, from_date, to_date, result)].
+        '''
+        with self.lock:
+            rows = self.conn.execute("SELECT pos, bond, company, from_date, to_date, result FROM tasks "
+                                     "WHERE status = 'done' ORDER BY pos").fetchall()
+        return [(*row[:5], json.loads(row[5])) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+class RemoteQueue:
+    '''
+    WorkQueue client for nodes that cannot share the SQLite file: calls a QueueServer over HTTP.
+    '''
+    def __init__(self, url: str, token: str, timeout: float = 30):
+        import requests
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _call(self, method: str, **params):
+        response = self.session.post(f"{self.url}/{method}", json=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["value"]
+
+    def claim(self, worker, lease=300): return self._call("claim", worker=worker, lease=lease)
+    def heartbeat(self, worker, positions, lease=300): return self._call("heartbeat", worker=worker, positions=positions, lease=lease)
+    def report(self, worker, pos, result): return self._call("report", worker=worker, pos=pos, result=result)
+    def release(self, worker, pos, error=None, retry=True): return self._call("release", worker=worker, pos=pos, error=error, retry=retry)
+    def status(self): return self._call("status")
+    def close(self): self.session.close()
+
+class QueueServer:
+    '''
+    Small coordinator process: serves a WorkQueue's claim / heartbeat / report / release / status as JSON POSTs.
+    Every request must carry 'Authorization: Bearer <token>'. Listens on localhost unless another 'host' is given
+    (e.g. "0.0.0.0" for nodes on other PCs; the token is then the only protection, so keep it on a trusted network).
+    '''
+    METHODS = ("claim", "heartbeat", "report", "release", "status")
+
+    def __init__(self, queue: WorkQueue, token: str, host: str = "127.0.0.1", port: int = 8765):
+        if not token: raise ValueError("QueueServer needs a token")
+        self.queue = queue
+        self.token = token
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host if host != '0.0.0.0' else '127.0.0.1'}:{self.server.server_port}"
+        self.thread = None
+
+    def _handler(self):
+        queue, expected = self.queue, f"Bearer {self.token}".encode("utf-8")
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not hmac.compare_digest(self.headers.get("Authorization", "").encode("utf-8"), expected):
+                    self.send_error(401); return
+                method = self.path.strip("/")
+                if method not in QueueServer.METHODS:
+                    self.send_error(404); return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    params = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(params, dict): raise ValueError("the body must be a JSON object")
+                except ValueError as e:
+                    self.send_error(400, str(e)); return
+                try: payload = json.dumps({"value": getattr(queue, method)(**params)}, ensure_ascii=False).encode("utf-8")
+                except Exception as e:
+                    self.send_error(500, str(e)); return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args): pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self): return self.start()
+
+    def __exit__(self, *exc): self.stop()
+
+class Heartbeat:
+    '''
+    Background thread extending a worker's leases every 'interval' seconds while it scrapes them.
+    '''
+    def __init__(self, queue, worker: str, positions: list, lease: float, interval: float):
+        self.queue, self.worker, self.positions, self.lease, self.interval = queue, worker, positions, lease, interval
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.done.wait(self.interval):
+            try: self.queue.heartbeat(self.worker, self.positions, self.lease)
+            except Exception as e: print(f"Heartbeat failed: {e}")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+
+def work(queue, config: dict, worker: str = None, lease: float = 300, heartbeat: float = 60, idle_exit: bool = True,
+         log=print, cancel_event: threading.Event = None) -> dict:
+    '''
+    Node loop: claim a company, scrape its bonds with this node's own scraper and rate limit, report, repeat.
+    Stops when the queue has nothing claimable (idle_exit) or 'cancel_event' is set. Returns the node's counts.
+    '''
+    from pipeline import DEFAULT_CONFIG, ScrapeRun, fetch_company
+    from resolver import IsinResolver
+    from utilitylib.ratelimit import BlockedError, ScrapeCancelled
+    from utilitylib.timing import AdaptiveTimers
+
+    worker = worker or worker_name()
+    run = ScrapeRun({**DEFAULT_CONFIG, **config, "workers": 1}, log=log, cancel_event=cancel_event)
+    resolver = IsinResolver(run.sidecar("results_isin.json")).load()
+    if run.config["adaptive_timers"]: run.timers = AdaptiveTimers(run.sidecar("results_timers.json")).load() # this node's latency
+    counts = {"worker": worker, "companies": 0, "bonds": 0, "failed": 0, "status": "completed"}
+    scraper = None
+    try:
+        scraper = run._make_scraper()
+        while run.running:
+            tasks = queue.claim(worker, lease)
+            if not tasks:
+                if idle_exit and not queue.status()["leased"]: break
+                time.sleep(min(heartbeat, 5)) # others still hold leases that may expire and come back
+                continue
+            company = tasks[0]["company"]
+            log(f"[{worker}] {company}: {len(tasks)}개 채권")
+            try:
+                with Heartbeat(queue, worker, [task["pos"] for task in tasks], lease, heartbeat):
+                    found = fetch_company(scraper, company, [(task["bond"], task["from_date"]) for task in tasks],
+                                          tasks[0]["to_date"], resolver=resolver, prices=run.config["prices"])
+            except (BlockedError, ScrapeCancelled) as e:
+                for task in tasks: queue.release(worker, task["pos"]) # not the bonds' fault: no attempt used
+                counts["status"] = "blocked" if isinstance(e, BlockedError) else "stopped"
+                break
+            except Exception as e:
+                log(f"[{worker}] {company} 오류: {e}")
+                for task in tasks: queue.release(worker, task["pos"], error=str(e))
+                counts["failed"] += len(tasks)
+                continue
+            for task, result in zip(tasks, found): queue.report(worker, task["pos"], result)
+            counts["companies"] += 1
+            counts["bonds"] += len(tasks)
+        if not run.running: counts["status"] = "stopped"
+    finally:
+        if scraper: scraper.cleanup()
+        resolver.save()
+        if run.timers:
+            run.timers.save()
+            counts["timers"] = run.timers.report()
+    return counts
+
+def collect(queue: WorkQueue, config: dict, log=print) -> dict:
+    '''
+    Merge the finished results into the output directory's store and export the outputs for the queued list.
+    '''
+    from pipeline import DEFAULT_CONFIG, ScrapeRun
+    from result_store import ResultStore
+    from export_results import make_sink
+
+    run = ScrapeRun({**DEFAULT_CONFIG, **config}, log=log)
+    store = ResultStore(run.sidecar("results.sqlite")).load(legacy_cache=run.sidecar("results_cache.json"))
+    items, unresolved = [], 0
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S") # append-only sinks get only the rows this collect changes
+    for pos, bond, company, from_date, to_date, result in queue.results():
+        items.append([bond, company])
+        if result.get("DB") is None:
+            unresolved += 1
+            continue
+        store.merge(company, bond, result["DB"], from_date, to_date)
+        if result.get("EX"): store.set_prices(company, bond, result["EX"]) # an empty result keeps the stored history
+    sink = make_sink(run.config["sink"], run.output_path, batch_size=run.config["excel_batch"])
+    try: counts = store.export(sink, items, since=stamp)
+    finally:
+        sink.close()
+        store.close()
+    log(f"{len(items)}개 채권의 결과를 내보냈습니다. (DB {counts['DB']}행, EX {counts['EX']}행)")
+    return {"bonds": len(items), "unresolved": unresolved, "rows": counts["DB"], "prices": counts["EX"], **queue.status()}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Split the company list across several scraping nodes.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, text in (("seed", "queue the company list"), ("serve", "run the coordinator for nodes without the shared file"),
+                       ("work", "run a scraping node"), ("status", "print the queue counts"), ("collect", "export the finished results")):
+        command = sub.add_parser(name, help=text)
+        if name == "work":
+            source = command.add_mutually_exclusive_group(required=True)
+            source.add_argument("--queue", help="shared queue file (SQLite)")
+            source.add_argument("--coordinator", help="coordinator URL (python work_queue.py serve)")
+        else:
+            command.add_argument("--queue", required=True, help="queue file (SQLite)")
+        command.add_argument("--output", help="workbook; store, ISIN index and exports live next to it")
+    sub.choices["seed"].add_argument("--list", dest="list_path", help="workbook with a LIST sheet or CSV (default: the output workbook)")
+    sub.choices["seed"].add_argument("--from", dest="from_date", default="20210101")
+    sub.choices["seed"].add_argument("--to", dest="to_date", default=time.strftime("%Y%m%d"))
+    sub.choices["seed"].add_argument("--full", action="store_true", help="do not start from the store's last dates")
+    sub.choices["seed"].add_argument("--reset", action="store_true", help="replace a queue holding another list or other windows "
+                                     "(its tasks and results are dropped)")
+    sub.choices["serve"].add_argument("--host", default="127.0.0.1", help="0.0.0.0 to accept nodes on other PCs")
+    sub.choices["serve"].add_argument("--port", type=int, default=8765)
+    work_args = sub.choices["work"]
+    for name in ("serve", "work"):
+        sub.choices[name].add_argument("--token", default=os.environ.get("KIND_QUEUE_TOKEN"),
+                                       help="coordinator access token (default: $KIND_QUEUE_TOKEN; serve generates one if unset)")
+    work_args.add_argument("--backend", choices=["browser", "http"], default="browser")
+    work_args.add_argument("--rate", type=float, help="this node's requests per second")
+    work_args.add_argument("--lease", type=float, default=300, help="seconds a claimed company stays reserved without a heartbeat")
+    work_args.add_argument("--heartbeat", type=float, default=60)
+    work_args.add_argument("--worker", help="node name (default: host-pid)")
+    work_args.add_argument("--base-url")
+    work_args.add_argument("--show-browser", action="store_true")
+    sub.choices["collect"].add_argument("--sink", default="excel")
+    args = parser.parse_args(argv)
+
+    config = {"output_path": args.output}
+    if args.command == "work":
+        if args.coordinator and not args.token: parser.error("--coordinator needs --token (or KIND_QUEUE_TOKEN)")
+        queue = WorkQueue(args.queue) if args.queue else RemoteQueue(args.coordinator, args.token)
+        config.update({"backend": args.backend, "rate": args.rate, "base_url": args.base_url, "headless": not args.show_browser})
+        cancel_event = threading.Event()
+        # Stop claiming. A browser node is interrupted inside its current company and releases it unreported
+        # (no attempt counted) for another node; the HTTP backend finishes the company's calls in flight first
+        signal.signal(signal.SIGINT, lambda signum, frame: cancel_event.set())
+        signal.signal(signal.SIGTERM, lambda signum, frame: cancel_event.set())
+        counts = work(queue, config, worker=args.worker, lease=args.lease, heartbeat=args.heartbeat, cancel_event=cancel_event)
+        print(json.dumps(counts, ensure_ascii=False), flush=True)
+        from cli import EXIT_OK, EXIT_BLOCKED, EXIT_STOPPED
+        return {"completed": EXIT_OK, "stopped": EXIT_STOPPED}.get(counts["status"], EXIT_BLOCKED)
+
+    queue = WorkQueue(args.queue)
+    if args.command == "seed":
+        from cli import read_items
+        from pipeline import ScrapeRun
+        from result_store import ResultStore
+        run = ScrapeRun(config)
+        items = read_items(args.list_path or run.output_path)
+        from_dates = [args.from_date] * len(items)
+        if not args.full:
+            store = ResultStore(run.sidecar("results.sqlite")).load(legacy_cache=run.sidecar("results_cache.json"))
+            from_dates = [store.since(company, bond, args.from_date) for bond, company in items]
+            store.close()
+        try: print(f"{queue.seed(items, from_dates, args.to_date, reset=args.reset, from_date=args.from_date)} bonds queued")
+        except QueueMismatch as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+    elif args.command == "serve":
+        token = args.token or secrets.token_urlsafe(24)
+        server = QueueServer(queue, token, args.host, args.port)
+        print(f"Work queue coordinator listening on {server.url}", flush=True)
+        if not args.token: print(f"Token (pass to the nodes with --token): {token}", flush=True)
+        server.server.serve_forever()
+    elif args.command == "status":
+        print(json.dumps(queue.status(), ensure_ascii=False))
+    elif args.command == "collect":
+        config["sink"] = args.sink
+        print(json.dumps(collect(queue, config), ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())